@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case
+
+from config import settings
+from crud import dialect_insert
+from database import AsyncSessionLocal
+from models import Attendance
+from rollups import refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE_TZ = ZoneInfo(settings.ATTENDANCE_TIMEZONE)
+LATE_AFTER = time.fromisoformat(settings.ATTENDANCE_LATE_AFTER)
+
+@dataclass(frozen=True)
+class AttendanceEvent:
+    employee_id: int
+    kind: str  # "in" or "out"
+    timestamp: datetime
+
+    @property
+    def utc_timestamp(self) -> datetime:
+        if self.timestamp.tzinfo is None:
+            return self.timestamp.replace(tzinfo=timezone.utc)
+        return self.timestamp.astimezone(timezone.utc)
+
+    @property
+    def local_date(self) -> date:
+        return self.utc_timestamp.astimezone(ATTENDANCE_TZ).date()
+
+def coalesce_events(events: List[AttendanceEvent]) -> List[dict]:
+    """Fold events into one row per (employee_id, date): earliest in, latest out"""
+    rows: Dict[Tuple[int, date], dict] = {}
+    for event in events:
+        key = (event.employee_id, event.local_date)
+        row = rows.setdefault(key, {
+            "employee_id": event.employee_id,
+            "date": key[1],
+            "check_in": None,
+            "check_out": None,
+            "status": "present",
+        })
+        stamp = event.utc_timestamp
+        if event.kind == "in":
+            if row["check_in"] is None or stamp < row["check_in"]:
+                row["check_in"] = stamp
+                local_time = stamp.astimezone(ATTENDANCE_TZ).time()
+                row["status"] = "late" if local_time > LATE_AFTER else "present"
+        elif row["check_out"] is None or stamp > row["check_out"]:
+            row["check_out"] = stamp
+    return list(rows.values())
+
+def _earliest(current, incoming):
+    return case(
+        (current.is_(None), incoming),
+        (incoming.is_(None), current),
+        (incoming < current, incoming),
+        else_=current,
+    )
+
+def _latest(current, incoming):
+    return case(
+        (current.is_(None), incoming),
+        (incoming.is_(None), current),
+        (incoming > current, incoming),
+        else_=current,
+    )
+
+async def upsert_attendance(db, rows: List[dict]):
+    """One multi-row upsert on the (employee_id, date) key; the caller commits"""
+    dialect = (await db.connection()).dialect.name
+    stmt = dialect_insert(dialect, Attendance).values(rows)
+    excluded = stmt.excluded
+    earlier_check_in = (excluded.check_in.isnot(None)) & (
+        Attendance.check_in.is_(None) | (excluded.check_in < Attendance.check_in)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Attendance.employee_id, Attendance.date],
+        set_={
+            "check_in": _earliest(Attendance.check_in, excluded.check_in),
+            "check_out": _latest(Attendance.check_out, excluded.check_out),
+            "status": case((earlier_check_in, excluded.status), else_=Attendance.status),
+        },
+    )
+    await db.execute(stmt)
+
+async def correct_attendance(db, attendance_id: int, changes: dict):
+    """Apply an HR correction and refresh that month's rollup in the same transaction"""
+    record = await db.get(Attendance, attendance_id)
+    if record is None:
+        return None
+    for field, value in changes.items():
+        setattr(record, field, value)
+    await db.flush()
+    await refresh_rollups(db, {(record.employee_id, record.date.year, record.date.month)})
+    await db.commit()
+    return record
+
+class AttendanceBatcher:
+    """Group commit for attendance events.
+
+    Callers await ``submit`` and are released only after the batch holding
+    their events has committed. A batch is flushed once ``max_events`` are
+    queued or ``flush_interval`` seconds after the first queued event.
+    """
+
+    def __init__(self, flush_interval: float, max_events: int):
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self._pending: Deque[Tuple[List[AttendanceEvent], asyncio.Future]] = deque()
+        self._pending_events = 0
+        self._has_pending: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+        self._stopping = False
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._stopping = False
+        self._has_pending = asyncio.Event()
+        self._full = asyncio.Event()
+        if self._pending:
+            self._has_pending.set()
+        self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """Flush whatever is queued and stop the writer"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._has_pending.set()
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, events: List[AttendanceEvent]):
+        if not events:
+            return
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((events, future))
+        self._pending_events += len(events)
+        self._has_pending.set()
+        if self._pending_events >= self.max_events:
+            self._full.set()
+        await future
+
+    def _take_batch(self):
+        batch, count = [], 0
+        while self._pending and (not batch or count + len(self._pending[0][0]) <= self.max_events):
+            events, future = self._pending.popleft()
+            batch.append((events, future))
+            count += len(events)
+        self._pending_events -= count
+        if not self._pending:
+            self._has_pending.clear()
+        if self._pending_events < self.max_events:
+            self._full.clear()
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._has_pending.wait()
+            if not self._stopping:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._take_batch()
+            if batch:
+                await self._flush(batch)
+            if self._stopping and not self._pending:
+                return
+
+    async def _flush(self, batch):
+        events = [event for group, _ in batch for event in group]
+        try:
+            await self._write(events)
+        except Exception as e:
+            if len(batch) == 1:
+                _resolve(batch[0][1], e)
+                return
+            # Retry each caller on its own so one bad submission can't fail the rest
+            logger.warning(f"Attendance batch of {len(events)} events failed, retrying per caller: {e}")
+            for group, future in batch:
+                try:
+                    await self._write(group)
+                except Exception as group_error:
+                    _resolve(future, group_error)
+                else:
+                    _resolve(future)
+            return
+        for _, future in batch:
+            _resolve(future)
+
+    async def _write(self, events: List[AttendanceEvent]):
+        rows = coalesce_events(events)
+        async with AsyncSessionLocal() as db:
+            await upsert_attendance(db, rows)
+            await refresh_rollups(db, {(row["employee_id"], row["date"].year, row["date"].month) for row in rows})
+            await db.commit()
+
+def _resolve(future: asyncio.Future, error: Optional[Exception] = None):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+attendance_batcher = AttendanceBatcher(
+    settings.ATTENDANCE_FLUSH_INTERVAL_MS / 1000,
+    settings.ATTENDANCE_FLUSH_MAX_EVENTS,
+)
@@ -1,17 +1,226 @@
+import asyncio
+import hashlib
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+from typing import List, Optional, Tuple
+from jose import ExpiredSignatureError, JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import argon2
+from cache import TTLCache
 from config import settings
+from metrics import JWT_DECODE_FAILURES, PASSWORD_HASH_DURATION
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+HASH_SCHEMES = ("bcrypt", "argon2")
+
+def build_pwd_context(scheme: str = None, bcrypt_rounds: int = None, argon2_time_cost: int = None,
+                      argon2_memory_cost: int = None, argon2_parallelism: int = None) -> CryptContext:
+    """CryptContext hashing with ``scheme`` at exactly the given costs (settings by default).
+
+    Costs are pinned (min = max = default), so needs_update flags hashes of
+    any other scheme or cost, higher or lower. argon2 hashes stay verifiable
+    under bcrypt as long as argon2-cffi is installed.
+    """
+    scheme = scheme or settings.PASSWORD_HASH_SCHEME
+    if scheme not in HASH_SCHEMES:
+        raise ValueError(f"Unknown PASSWORD_HASH_SCHEME {scheme!r}; expected one of {', '.join(HASH_SCHEMES)}")
+    if scheme == "argon2" and not argon2.has_backend():
+        raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 needs the argon2-cffi package")
+    rounds = bcrypt_rounds or settings.BCRYPT_ROUNDS
+    time_cost = argon2_time_cost or settings.ARGON2_TIME_COST
+    options = {
+        "bcrypt__default_rounds": rounds,
+        "bcrypt__min_rounds": rounds,
+        "bcrypt__max_rounds": rounds,
+    }
+    schemes = [scheme] + [other for other in HASH_SCHEMES if other != scheme]
+    if not argon2.has_backend():
+        schemes.remove("argon2")
+    else:
+        options.update({
+            "argon2__default_rounds": time_cost,
+            "argon2__min_rounds": time_cost,
+            "argon2__max_rounds": time_cost,
+            "argon2__memory_cost": argon2_memory_cost or settings.ARGON2_MEMORY_COST_KIB,
+            "argon2__parallelism": argon2_parallelism or settings.ARGON2_PARALLELISM,
+        })
+    return CryptContext(schemes=schemes, default=scheme, deprecated="auto", **options)
+
+pwd_context = build_pwd_context()
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Detached snapshot of the authenticated user, safe to share between requests"""
+    id: int
+    email: str
+    employee_id: str
+    role: str
+    is_active: bool
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            employee_id=user.employee_id,
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+class HashingUnavailableError(Exception):
+    """Raised when no password hashing worker is available in time"""
+
+# Dedicated process pool for bcrypt so hashing never runs on the request workers
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+_hash_slots_loop = None
+_hash_waiting = 0
+_bulk_holding = 0
+
+# Bulk hashing (imports) returns its slot after every chunk; a chunk is sized
+# to take at most a quarter of HASH_QUEUE_TIMEOUT at the calibrated cost, so a
+# login that queues behind one never times out
+BULK_HASH_CHUNK_SIZE = max(1, int(settings.HASH_QUEUE_TIMEOUT * 1000 / 4 // settings.PASSWORD_HASH_BUDGET_MS))
+BULK_HASH_POLL_SECONDS = 0.02
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(verified, replacement hash or None); a replacement is made when the stored hash is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    """Return the password hashing process pool, creating it on first use"""
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=settings.HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_executor
+
+def shutdown_hash_executor():
+    """Stop the password hashing process pool"""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+def _get_hash_slots() -> asyncio.Semaphore:
+    global _hash_slots, _hash_slots_loop
+    loop = asyncio.get_running_loop()
+    if _hash_slots is None or _hash_slots_loop is not loop:
+        _hash_slots = asyncio.Semaphore(settings.HASH_WORKERS)
+        _hash_slots_loop = loop
+    return _hash_slots
+
+async def _acquire_hash_slot(slots: asyncio.Semaphore):
+    """Wait for a free hashing worker, bounded in queue length and wait time"""
+    global _hash_waiting
+    if not slots.locked():
+        await slots.acquire()
+        return
+    if _hash_waiting >= settings.HASH_QUEUE_SIZE:
+        raise HashingUnavailableError("Password hashing queue is full")
+    _hash_waiting += 1
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=settings.HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HashingUnavailableError("Timed out waiting for a password hashing worker")
+    finally:
+        _hash_waiting -= 1
+
+async def _run_in_hash_executor(operation: str, func, *args):
+    slots = _get_hash_slots()
+    await _acquire_hash_slot(slots)
+    try:
+        loop = asyncio.get_running_loop()
+        with PASSWORD_HASH_DURATION.labels(operation).time():
+            return await loop.run_in_executor(get_hash_executor(), func, *args)
+    except BrokenProcessPool:
+        # A worker died; drop the pool so the next call starts a fresh one
+        shutdown_hash_executor()
+        raise HashingUnavailableError("Password hashing pool is restarting")
+    finally:
+        slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_executor("verify", verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # Rehashing happens in the same pool call, so it costs an upgrading login one extra hash
+    return await _run_in_hash_executor("verify", verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_executor("hash", get_password_hash, password)
+
+async def _acquire_bulk_slot(slots: asyncio.Semaphore):
+    """Take a hashing slot for bulk work without ever queueing ahead of a request.
+
+    Bulk work holds at most HASH_WORKERS - 1 slots, so requests keep a worker
+    to themselves; with a single worker it only takes the slot while no
+    request is waiting for it. Polling rather than queueing on the semaphore
+    keeps bulk chunks out of the line requests wait in.
+    """
+    global _bulk_holding
+    while _hash_waiting or slots.locked() or _bulk_holding >= max(1, settings.HASH_WORKERS - 1):
+        await asyncio.sleep(BULK_HASH_POLL_SECONDS)
+    await slots.acquire()
+    _bulk_holding += 1
+
+def _release_bulk_slot(slots: asyncio.Semaphore):
+    global _bulk_holding
+    _bulk_holding -= 1
+    slots.release()
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    """Hash a batch for bulk work in chunks of BULK_HASH_CHUNK_SIZE, yielding to logins between chunks"""
+    if not passwords:
+        return []
+    slots = _get_hash_slots()
+    loop = asyncio.get_running_loop()
+    starts = deque(range(0, len(passwords), BULK_HASH_CHUNK_SIZE))
+    hashes: List[Optional[str]] = [None] * len(passwords)
+
+    async def hash_chunks():
+        while starts:
+            start = starts.popleft()
+            chunk = passwords[start:start + BULK_HASH_CHUNK_SIZE]
+            await _acquire_bulk_slot(slots)
+            try:
+                with PASSWORD_HASH_DURATION.labels("hash_batch").time():
+                    hashes[start:start + len(chunk)] = await loop.run_in_executor(
+                        get_hash_executor(), get_password_hashes, chunk
+                    )
+            except BrokenProcessPool:
+                shutdown_hash_executor()
+                raise HashingUnavailableError("Password hashing pool is restarting")
+            finally:
+                _release_bulk_slot(slots)
+
+    tasks = [asyncio.ensure_future(hash_chunks()) for _ in range(max(1, settings.HASH_WORKERS - 1))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return hashes
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -22,9 +231,36 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+# Claims of tokens that already passed verification, keyed by a digest of
+# the token and kept until the token's exp. Each entry remembers the secret
+# and algorithm it was verified with, so changing either invalidates it.
+token_cache = TTLCache(settings.TOKEN_CACHE_MAX_SIZE, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_token_cache_keys = None
+
+def _signing_keys():
+    global _token_cache_keys
+    keys = (settings.JWT_SECRET, settings.JWT_ALGORITHM)
+    if keys != _token_cache_keys:
+        token_cache.clear()
+        _token_cache_keys = keys
+    return keys
+
 def verify_token(token: str) -> Optional[dict]:
+    keys = _signing_keys()
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(digest)
+    if cached is not None and cached[0] == keys:
+        return dict(cached[1])
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        return payload
+        payload = jwt.decode(token, keys[0], algorithms=[keys[1]])
+    except ExpiredSignatureError:
+        JWT_DECODE_FAILURES.labels("expired").inc()
+        return None
     except JWTError:
+        JWT_DECODE_FAILURES.labels("invalid").inc()
         return None
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    if ttl is None or ttl > 0:
+        token_cache.set(digest, (keys, dict(payload)), ttl=ttl)
+    return payload
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the API hot paths.
+
+Drives login, register, /api/users/me, /api/employees/me and /api/health at
+a fixed concurrency, one scenario at a time, and reports throughput and
+p50/p95/p99 latency. Without --base-url a local server is started on a
+throwaway SQLite database (or --database-url, e.g. a local Postgres).
+
+    python benchmarks/load.py run [--concurrency 32] [--duration 10] [--output results.json]
+    python benchmarks/load.py compare baseline.json results.json [--threshold 0.15]
+
+``compare`` exits with status 1 when any scenario's p95 latency rises, or
+its throughput falls, by more than the threshold against the baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("health", "login", "register", "users_me", "employees_me")
+PASSWORD = "bench-password"
+
+class Result:
+    """Latencies and failures of one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def add(self, started: float, response: Optional[httpx.Response], expected: int):
+        self.latencies.append(time.perf_counter() - started)
+        status = str(response.status_code) if response is not None else "error"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if response is None or response.status_code != expected:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        if count >= 2:
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0.0
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "duration_s": round(self.elapsed, 3),
+            "throughput_rps": round(count / self.elapsed, 1) if self.elapsed else 0.0,
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50_ms": round(p50 * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "p99_ms": round(p99 * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+
+class Users:
+    """Benchmark accounts, each with an employee profile and a bearer token"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.accounts: List[dict] = []
+        self._registered = 0
+
+    def next_registration(self) -> dict:
+        self._registered += 1
+        n = self._registered
+        return {
+            "email": f"reg-{self.run_id}-{n}@bench.example.com",
+            "employee_id": f"R{self.run_id}{n}",
+            "role": "employee",
+            "password": PASSWORD,
+        }
+
+    async def create(self, client: httpx.AsyncClient, count: int):
+        for n in range(count):
+            account = {"email": f"user-{self.run_id}-{n}@bench.example.com", "employee_id": f"U{self.run_id}{n}"}
+            response = await client.post("/api/auth/register", json={**account, "role": "employee", "password": PASSWORD})
+            response.raise_for_status()
+            response = await client.post(
+                "/api/auth/login", json={"email_or_employee_id": account["email"], "password": PASSWORD}
+            )
+            response.raise_for_status()
+            account["headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            response = await client.post(
+                "/api/employees",
+                json={"first_name": "Bench", "last_name": f"User{n}", "department": "Benchmark", "salary": 50000},
+                headers=account["headers"],
+            )
+            response.raise_for_status()
+            self.accounts.append(account)
+
+def scenario_request(name: str, client: httpx.AsyncClient, users: Users, n: int):
+    """(request coroutine, expected status) for the n-th request of a scenario"""
+    account = users.accounts[n % len(users.accounts)]
+    if name == "health":
+        return client.get("/api/health"), 200
+    if name == "login":
+        identifier = account["email"] if n % 2 else account["employee_id"]
+        return client.post("/api/auth/login", json={"email_or_employee_id": identifier, "password": PASSWORD}), 200
+    if name == "register":
+        return client.post("/api/auth/register", json=users.next_registration()), 200
+    if name == "users_me":
+        return client.get("/api/users/me", headers=account["headers"]), 200
+    if name == "employees_me":
+        return client.get("/api/employees/me", headers=account["headers"]), 200
+    raise ValueError(f"Unknown scenario {name}")
+
+async def run_scenario(name: str, client: httpx.AsyncClient, users: Users, concurrency: int,
+                       duration: float, warmup: float) -> Result:
+    result = Result(name)
+    counter = 0
+    measuring = False
+    deadline = time.perf_counter() + warmup
+
+    async def worker():
+        nonlocal counter
+        while time.perf_counter() < deadline:
+            counter += 1
+            request, expected = scenario_request(name, client, users, counter)
+            recording = measuring
+            started = time.perf_counter()
+            try:
+                response = await request
+            except httpx.HTTPError:
+                response = None
+            if recording:
+                result.add(started, response, expected)
+
+    if warmup > 0:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    measuring = True
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(database_url: str, workers: int, workdir: str, log_path: str):
+    """Serve the app with uvicorn in a subprocess; returns (process, base_url)"""
+    port = _free_port()
+    # Every benchmark client shares one address, so per-IP login limits stay off unless asked for
+    env = {"AUTH_RATE_LIMIT_ENABLED": "false", **os.environ, "DATABASE_URL": database_url}
+    log = open(log_path, "wb")
+    # Run from the scratch directory: SQLite URLs resolve to ./hrms.db there, not the working copy
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", ROOT, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}; see {log_path}")
+        try:
+            if httpx.get(f"{base_url}/api/health/live", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    process.terminate()
+    raise RuntimeError(f"Server did not become live within 60s; see {log_path}")
+
+async def run_all(args, base_url: str) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        users = Users(uuid.uuid4().hex[:8])
+        await users.create(client, args.users)
+        scenarios = {}
+        for name in args.scenarios:
+            result = await run_scenario(name, client, users, args.concurrency, args.duration, args.warmup)
+            scenarios[name] = result.summary()
+            print_scenario(name, scenarios[name])
+    return scenarios
+
+def print_scenario(name: str, summary: dict):
+    print(
+        f"{name:<14} {summary['throughput_rps']:>9.1f} req/s  "
+        f"p50 {summary['p50_ms']:>8.2f} ms  p95 {summary['p95_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms  "
+        f"errors {summary['errors']}/{summary['requests']}"
+    )
+
+def command_run(args) -> int:
+    process = None
+    workdir = tempfile.mkdtemp(prefix="hrms-bench-")
+    database_url = args.database_url or "sqlite:///./hrms.db"
+    base_url = args.base_url
+    if base_url is None:
+        log_path = os.path.join(workdir, "server.log")
+        process, base_url = start_server(database_url, args.server_workers, workdir, log_path)
+        print(f"Started server at {base_url} (log: {log_path})")
+    try:
+        scenarios = asyncio.run(run_all(args, base_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "base_url": base_url,
+            "database": "external" if args.base_url else database_url.split(":", 1)[0],
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "users": args.users,
+            "server_workers": None if args.base_url else args.server_workers,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": scenarios,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 1 if any(s["errors"] for s in scenarios.values()) and args.fail_on_errors else 0
+
+def command_compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)["scenarios"]
+    with open(args.current) as f:
+        current = json.load(f)["scenarios"]
+
+    failures = []
+    for name, before in baseline.items():
+        after = current.get(name)
+        if after is None:
+            print(f"{name:<14} missing from current results")
+            continue
+        latency_change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        throughput_change = (
+            (after["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"]
+            if before["throughput_rps"] else 0.0
+        )
+        regressed = latency_change > args.threshold or throughput_change < -args.threshold
+        print(
+            f"{name:<14} p95 {before['p95_ms']:>8.2f} -> {after['p95_ms']:>8.2f} ms ({latency_change:+.1%})  "
+            f"throughput {before['throughput_rps']:>9.1f} -> {after['throughput_rps']:>9.1f} req/s "
+            f"({throughput_change:+.1%}){'  REGRESSED' if regressed else ''}"
+        )
+        if regressed:
+            failures.append(name)
+
+    if failures:
+        print(f"Regression beyond {args.threshold:.0%} in: {', '.join(failures)}")
+        return 1
+    print(f"No regression beyond {args.threshold:.0%}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the load scenarios and report latency and throughput")
+    run.add_argument("--base-url", help="Benchmark a running server instead of starting one")
+    run.add_argument("--database-url", help="Database for the started server (default: SQLite in a temporary directory)")
+    run.add_argument("--server-workers", type=int, default=1, help="uvicorn workers for the started server")
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    run.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each scenario")
+    run.add_argument("--users", type=int, default=20, help="Accounts created for the authenticated scenarios")
+    run.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    run.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run.add_argument("--output", help="Write results as JSON to this path")
+    run.add_argument("--fail-on-errors", action="store_true", help="Exit 1 if any request failed")
+    run.set_defaults(handler=command_run)
+
+    compare = commands.add_parser("compare", help="Compare results against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.15,
+                         help="Allowed relative p95 increase / throughput drop (default 0.15)")
+    compare.set_defaults(handler=command_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-request CPU of the ORM + orm_mode read path versus
+the column-row + orjson path used by the read endpoints.
+
+Both paths read the same employee from an in-memory SQLite database and
+produce the JSON body for /api/employees/me; the database round trip is
+included so ORM hydration is part of the measurement.
+
+    python benchmarks/serialization.py [--iterations 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from crud import EMPLOYEE_RESPONSE_COLUMNS
+from models import Base, Employee, User
+from schemas import EmployeeResponse
+from serialization import dumps, employee_payload
+
+warnings.simplefilter("ignore")
+
+def validate_orm(obj) -> EmployeeResponse:
+    # What FastAPI does with a response_model on pydantic v2 and v1 respectively
+    if hasattr(EmployeeResponse, "model_validate"):
+        return EmployeeResponse.model_validate(obj, from_attributes=True)
+    return EmployeeResponse.from_orm(obj)
+
+def orm_path(session: Session, user_id: int) -> bytes:
+    employee = session.execute(select(Employee).where(Employee.user_id == user_id)).scalars().first()
+    model = validate_orm(employee)
+    body = json.dumps(jsonable_encoder(model)).encode()
+    session.expunge_all()  # a request gets a fresh session, so no identity-map reuse
+    return body
+
+def row_path(session: Session, user_id: int) -> bytes:
+    row = session.execute(select(*EMPLOYEE_RESPONSE_COLUMNS).where(Employee.user_id == user_id)).first()
+    return dumps(employee_payload(row))
+
+def measure(fn, iterations: int) -> float:
+    for _ in range(min(1000, iterations)):
+        fn()
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+def report(label: str, slow_us: float, fast_us: float):
+    print(label)
+    print(f"  ORM + orm_mode + json : {slow_us:8.1f} us CPU/request")
+    print(f"  columns + orjson      : {fast_us:8.1f} us CPU/request")
+    print(f"  saved                 : {slow_us - fast_us:8.1f} us CPU/request ({(1 - fast_us / slow_us) * 100:.0f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(email="bench@example.com", employee_id="BENCH1", hashed_password="x", role="employee")
+        session.add(user)
+        session.flush()
+        session.add(Employee(
+            user_id=user.id, first_name="Ada", last_name="Lovelace", phone="555-0100",
+            address="12 St James's Square", department="Engineering", position="Analyst",
+            hire_date=date(2020, 1, 6), salary=Decimal("85000.00"),
+        ))
+        session.commit()
+        user_id = user.id
+
+        assert json.loads(orm_path(session, user_id)) == json.loads(row_path(session, user_id))
+        report(
+            "query + hydrate + encode",
+            measure(lambda: orm_path(session, user_id), args.iterations),
+            measure(lambda: row_path(session, user_id), args.iterations),
+        )
+
+        # Encoding alone, from an already loaded object / row
+        employee = session.execute(select(Employee).where(Employee.user_id == user_id)).scalars().first()
+        row = session.execute(select(*EMPLOYEE_RESPONSE_COLUMNS).where(Employee.user_id == user_id)).first()
+        report(
+            "encode only",
+            measure(lambda: json.dumps(jsonable_encoder(validate_orm(employee))).encode(), args.iterations),
+            measure(lambda: dumps(employee_payload(row)), args.iterations),
+        )
+
+if __name__ == "__main__":
+    main()
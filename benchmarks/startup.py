@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Startup profile: what a worker pays before it can serve.
+
+Reports the wall time of ``import main`` with the heaviest modules from
+``python -X importtime``, then starts uvicorn and times spawn to the first
+successful /api/health/live (interpreter start, imports and startup hooks)
+in each DB_STARTUP_MODE. The server runs against a scratch SQLite database
+(stamped with ``alembic upgrade head`` for "verify") unless --database-url
+is given.
+
+    python benchmarks/startup.py [--modes create_all verify] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from load import ROOT, start_server
+
+def import_profile(top: int):
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=tempfile.mkdtemp(prefix="hrms-import-"),
+        env={**os.environ, "PYTHONPATH": ROOT},
+        capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - started
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((int(cumulative_us), depth, name.strip()))
+    main_cumulative = next((cumulative for cumulative, depth, name in entries if depth == 0 and name == "main"), 0)
+    print(f"python -c 'import main': {wall * 1000:.0f} ms wall, {main_cumulative / 1000:.0f} ms importing main")
+    print("Heaviest imports made directly by main (cumulative):")
+    direct = sorted(((cumulative, name) for cumulative, depth, name in entries if depth == 1), reverse=True)
+    for cumulative, name in direct[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+def time_to_live(mode: str, database_url: str) -> float:
+    workdir = tempfile.mkdtemp(prefix="hrms-startup-")
+    env_backup = os.environ.get("DB_STARTUP_MODE")
+    os.environ["DB_STARTUP_MODE"] = mode
+    try:
+        if mode == "verify":
+            subprocess.run(
+                [sys.executable, "-m", "alembic", "-c", os.path.join(ROOT, "alembic.ini"), "upgrade", "head"],
+                cwd=workdir, env={**os.environ, "DATABASE_URL": database_url, "PYTHONPATH": ROOT},
+                capture_output=True, check=True,
+            )
+        started = time.perf_counter()
+        process, _ = start_server(database_url, 1, workdir, os.path.join(workdir, "server.log"))
+        elapsed = time.perf_counter() - started
+        process.terminate()
+        process.wait(timeout=30)
+        return elapsed
+    finally:
+        if env_backup is None:
+            os.environ.pop("DB_STARTUP_MODE", None)
+        else:
+            os.environ["DB_STARTUP_MODE"] = env_backup
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["create_all", "verify"], choices=["create_all", "verify", "skip"])
+    parser.add_argument("--database-url", default="sqlite:///./hrms.db",
+                        help="database for the started servers (default: SQLite in a scratch directory)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+    print("Spawn to first /api/health/live:")
+    for mode in args.modes:
+        timings = sorted(time_to_live(mode, args.database_url) for _ in range(args.runs))
+        print(f"  {mode:<10} median {timings[len(timings) // 2] * 1000:6.0f} ms  (min {timings[0] * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class IdentifierFilter:
+    """Bloom filter of known login identifiers, fed incrementally.
+
+    Until the first load completes every identifier is reported as possibly
+    known. Incremental syncs (see crud.sync_login_filter) pick up new ids and
+    rows changed around the previous sync, and a full reload every
+    ``rebuild_interval`` seconds bounds how long a row missed by both can
+    stay out of the filter.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float, rebuild_interval: float):
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.ready = False
+        self.last_user_id = 0
+        self.synced_at: Optional[datetime] = None
+        self._min_capacity = capacity
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_sync = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """Over capacity, or the last full load is older than rebuild_interval"""
+        if self._bloom.count > self._bloom.capacity:
+            return True
+        return self.ready and time.monotonic() - self._loaded_at > self.rebuild_interval
+
+    def reset(self, expected_items: int):
+        with self._lock:
+            self._bloom = BloomFilter(max(self._min_capacity, expected_items * 2), self.error_rate)
+            self.last_user_id = 0
+            self.synced_at = None
+            self.ready = False
+
+    def add(self, *identifiers: str):
+        with self._lock:
+            for identifier in identifiers:
+                self._bloom.add(identifier.lower())
+
+    def mark_synced(self, last_user_id: int, started_at: datetime):
+        """Record a completed sync that began (by the clock rows are stamped with) at ``started_at``"""
+        with self._lock:
+            if self.synced_at is None:
+                self._loaded_at = time.monotonic()
+            self.last_user_id = max(self.last_user_id, last_user_id)
+            self.synced_at = started_at
+            self.ready = True
+
+    def might_contain(self, identifier: str) -> bool:
+        if not self.ready:
+            return True
+        return identifier.lower() in self._bloom
+
+    def claim_sync(self) -> bool:
+        """Rate-limit catch-up syncs to one per interval however many unknown identifiers arrive"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sync < self.sync_interval:
+                return False
+            self._last_sync = now
+            return True
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Password hash cost calibration.
+
+Times hashing on this machine at increasing costs, with --parallel
+processes hashing at once (the login load the HASH_WORKERS pool sees), and
+picks the highest cost whose slowest sample still fits the per-login
+budget (PASSWORD_HASH_BUDGET_MS). Run it on the deployment hardware and set
+the printed variables; existing hashes move to the new cost as users log in.
+
+    python calibrate_hashing.py [--scheme bcrypt|argon2] [--budget-ms 250] [--parallel 4]
+"""
+
+import argparse
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from passlib.hash import argon2
+
+from auth import build_pwd_context
+from config import settings
+
+PASSWORD = "calibration-Passw0rd!"
+BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS = 4, 20
+ARGON2_MAX_TIME_COST = 20
+# Below this bcrypt cost hashes are cheap enough to brute-force offline
+BCRYPT_RECOMMENDED_ROUNDS = 10
+
+def _time_hashes(options: dict, count: int) -> List[float]:
+    context = build_pwd_context(**options)
+    context.hash(PASSWORD)  # warm up the backend
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        context.hash(PASSWORD)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def measure(executor: ProcessPoolExecutor, options: dict, parallel: int, samples: int) -> List[float]:
+    """Per-hash seconds with ``parallel`` processes hashing concurrently"""
+    futures = [executor.submit(_time_hashes, options, samples) for _ in range(parallel)]
+    return sorted(timing for future in futures for timing in future.result())
+
+def calibrate(scheme: str, budget_ms: float, parallel: int, samples: int, memory_cost: int, parallelism: int):
+    """Return (options of the highest cost within budget or None, its slowest hash in ms)"""
+    if scheme == "bcrypt":
+        costs = range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1)
+        make_options = lambda cost: {"scheme": "bcrypt", "bcrypt_rounds": cost}
+    else:
+        costs = range(1, ARGON2_MAX_TIME_COST + 1)
+        make_options = lambda cost: {
+            "scheme": "argon2", "argon2_time_cost": cost,
+            "argon2_memory_cost": memory_cost, "argon2_parallelism": parallelism,
+        }
+    chosen, chosen_worst_ms = None, None
+    executor = ProcessPoolExecutor(max_workers=parallel, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        for cost in costs:
+            timings = measure(executor, make_options(cost), parallel, samples)
+            median_ms, worst_ms = statistics.median(timings) * 1000, timings[-1] * 1000
+            print(f"  cost {cost:>2}: median {median_ms:8.1f} ms  worst {worst_ms:8.1f} ms")
+            if worst_ms > budget_ms:
+                break
+            chosen, chosen_worst_ms = make_options(cost), worst_ms
+    finally:
+        executor.shutdown()
+    return chosen, chosen_worst_ms
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the password hash cost that fits a per-login time budget")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--budget-ms", type=float, default=settings.PASSWORD_HASH_BUDGET_MS,
+                        help="slowest acceptable hash, in ms (default PASSWORD_HASH_BUDGET_MS)")
+    parser.add_argument("--parallel", type=int, default=settings.HASH_WORKERS,
+                        help="processes hashing at once while measuring (default HASH_WORKERS)")
+    parser.add_argument("--samples", type=int, default=5, help="hashes per process and cost")
+    parser.add_argument("--memory-kib", type=int, default=settings.ARGON2_MEMORY_COST_KIB,
+                        help="argon2 memory cost, kept fixed while the time cost is searched")
+    parser.add_argument("--argon2-parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    args = parser.parse_args()
+    if args.scheme == "argon2" and not argon2.has_backend():
+        parser.error("argon2 needs the argon2-cffi package")
+
+    print(f"Calibrating {args.scheme} for {args.budget_ms:.0f} ms per hash with {args.parallel} concurrent hashers")
+    chosen, worst_ms = calibrate(
+        args.scheme, args.budget_ms, args.parallel, args.samples, args.memory_kib, args.argon2_parallelism
+    )
+    if chosen is None:
+        print("Even the lowest cost exceeds the budget; raise it"
+              + (" or lower --memory-kib" if args.scheme == "argon2" else ""))
+        raise SystemExit(1)
+
+    print(f"Slowest hash at the chosen cost: {worst_ms:.1f} ms; "
+          f"about {args.parallel * 1000 / worst_ms:.0f} logins/s with {args.parallel} hashing workers")
+    print("Set in the environment:")
+    print(f"  PASSWORD_HASH_SCHEME={args.scheme}")
+    if args.scheme == "bcrypt":
+        print(f"  BCRYPT_ROUNDS={chosen['bcrypt_rounds']}")
+        if chosen["bcrypt_rounds"] < BCRYPT_RECOMMENDED_ROUNDS:
+            print(f"Warning: bcrypt below {BCRYPT_RECOMMENDED_ROUNDS} rounds is weak; "
+                  f"consider more hashing workers or a larger budget")
+    else:
+        print(f"  ARGON2_TIME_COST={chosen['argon2_time_cost']}")
+        print(f"  ARGON2_MEMORY_COST_KIB={chosen['argon2_memory_cost']}")
+        print(f"  ARGON2_PARALLELISM={chosen['argon2_parallelism']}")
+
+if __name__ == "__main__":
+    main()
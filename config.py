@@ -12,14 +12,135 @@ class Settings:
     if not DATABASE_URL or DATABASE_URL.startswith("sqlite"):
         DATABASE_URL = "sqlite:///./hrms.db"
     
+    # Async driver URL for the API; derived from DATABASE_URL when unset
+    # (postgresql+asyncpg for PostgreSQL, sqlite+aiosqlite for SQLite)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    
+    # Optional read replica for read-only routes (same URL format; unset =
+    # everything reads from the primary). A client that wrote within
+    # REPLICA_STICKY_SECONDS reads from the primary so it sees its own
+    # writes; a replica that fails its health probe or lags by more than
+    # REPLICA_MAX_LAG_SECONDS (PostgreSQL) is skipped until it recovers.
+    # The sticky window defaults to, and is never shorter than,
+    # REPLICA_MAX_LAG_SECONDS + HEALTH_PROBE_INTERVAL_SECONDS
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+    REPLICA_STICKY_SECONDS: float = float(os.getenv("REPLICA_STICKY_SECONDS", "0"))
+    REPLICA_STICKY_MAX_CLIENTS: int = int(os.getenv("REPLICA_STICKY_MAX_CLIENTS", "100000"))
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+    
     # JWT Configuration
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your-super-secret-jwt-key-change-this-in-production")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Verified tokens cached per worker until they expire (0 disables)
+    TOKEN_CACHE_MAX_SIZE: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+    
+    # Server processes per instance (set by gunicorn.conf.py when unset)
+    WEB_CONCURRENCY: int = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
     
     # Database Configuration
     DB_SSL_MODE: str = os.getenv("DB_SSL_MODE", "require")
     DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
     DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    # Connections the whole instance may open; when set, it is split evenly
+    # across WEB_CONCURRENCY workers and overrides DB_POOL_SIZE/DB_MAX_OVERFLOW
+    # (keep it below PostgreSQL max_connections minus other clients). 0 = unset
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+    # Boot-time schema handling: "create_all" creates missing tables (local
+    # development), "verify" only checks the Alembic revision stamp in one
+    # query (production), "skip" does neither
+    DB_STARTUP_MODE: str = os.getenv("DB_STARTUP_MODE", "create_all")
+    
+    # Password hashing: new hashes use PASSWORD_HASH_SCHEME ("bcrypt", or
+    # "argon2" with argon2-cffi installed) at the costs below, and a stored
+    # hash of another scheme or cost is replaced on the user's next login.
+    # Pick the costs with `python calibrate_hashing.py`, which fits them to
+    # PASSWORD_HASH_BUDGET_MS per verification on the machine it runs on
+    PASSWORD_HASH_SCHEME: str = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+    PASSWORD_HASH_BUDGET_MS: float = float(os.getenv("PASSWORD_HASH_BUDGET_MS", "250"))
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST_KIB: int = int(os.getenv("ARGON2_MEMORY_COST_KIB", "65536"))
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "1"))
+    
+    # Password hashing pool (bcrypt runs in separate processes); each server
+    # worker has its own pool, so the default shares the cores between them
+    HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+    HASH_QUEUE_SIZE: int = int(os.getenv("HASH_QUEUE_SIZE", "256"))
+    HASH_QUEUE_TIMEOUT: float = float(os.getenv("HASH_QUEUE_TIMEOUT", "2.0"))
+    
+    # Admission control for login and register, checked before any database
+    # or hashing work: token buckets per client IP and per login identifier
+    # (failed logins only) answer 429, and more than AUTH_MAX_IN_FLIGHT
+    # concurrent attempts per worker answer 503. Limits are per instance
+    # (split across workers); AUTH_LIMITER_MAX_KEYS bounds each bucket map
+    AUTH_RATE_LIMIT_ENABLED: bool = os.getenv("AUTH_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    AUTH_IP_RATE_PER_MINUTE: float = float(os.getenv("AUTH_IP_RATE_PER_MINUTE", "60"))
+    AUTH_IP_BURST: float = float(os.getenv("AUTH_IP_BURST", "20"))
+    AUTH_IDENTIFIER_FAILURES_PER_MINUTE: float = float(os.getenv("AUTH_IDENTIFIER_FAILURES_PER_MINUTE", "5"))
+    AUTH_IDENTIFIER_BURST: float = float(os.getenv("AUTH_IDENTIFIER_BURST", "10"))
+    AUTH_LIMITER_MAX_KEYS: int = int(os.getenv("AUTH_LIMITER_MAX_KEYS", "100000"))
+    AUTH_MAX_IN_FLIGHT: int = int(os.getenv("AUTH_MAX_IN_FLIGHT", str(HASH_WORKERS * 4)))
+    
+    # Authenticated user cache (per worker process)
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+    
+    # Bloom filter of known login identifiers (rejects unknown ones without a query)
+    LOGIN_FILTER_ENABLED: bool = os.getenv("LOGIN_FILTER_ENABLED", "true").lower() == "true"
+    LOGIN_FILTER_CAPACITY: int = int(os.getenv("LOGIN_FILTER_CAPACITY", "100000"))
+    LOGIN_FILTER_ERROR_RATE: float = float(os.getenv("LOGIN_FILTER_ERROR_RATE", "0.01"))
+    LOGIN_FILTER_SYNC_INTERVAL: float = float(os.getenv("LOGIN_FILTER_SYNC_INTERVAL", "1.0"))
+    # Each sync re-reads users created/updated this long before the previous
+    # one (commits land out of id order); a full reload catches anything older
+    LOGIN_FILTER_LOOKBACK_SECONDS: float = float(os.getenv("LOGIN_FILTER_LOOKBACK_SECONDS", "120"))
+    LOGIN_FILTER_REBUILD_SECONDS: float = float(os.getenv("LOGIN_FILTER_REBUILD_SECONDS", "900"))
+    
+    # Bulk employee import (runs as a background job; jobs beyond
+    # IMPORT_MAX_RUNNING_JOBS per worker wait their turn)
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+    IMPORT_MAX_RUNNING_JOBS: int = int(os.getenv("IMPORT_MAX_RUNNING_JOBS", "1"))
+    
+    # Attendance ingestion (events are group-committed)
+    ATTENDANCE_FLUSH_INTERVAL_MS: int = int(os.getenv("ATTENDANCE_FLUSH_INTERVAL_MS", "50"))
+    ATTENDANCE_FLUSH_MAX_EVENTS: int = int(os.getenv("ATTENDANCE_FLUSH_MAX_EVENTS", "500"))
+    ATTENDANCE_TIMEZONE: str = os.getenv("ATTENDANCE_TIMEZONE", "UTC")
+    ATTENDANCE_LATE_AFTER: str = os.getenv("ATTENDANCE_LATE_AFTER", "09:15")
+    
+    # Payroll runs
+    PAYROLL_ALLOWANCE_RATE: str = os.getenv("PAYROLL_ALLOWANCE_RATE", "0")
+    PAYROLL_UNPAID_LEAVE_TYPES: str = os.getenv("PAYROLL_UNPAID_LEAVE_TYPES", "unpaid")
+    PAYROLL_PARALLELISM: int = int(os.getenv("PAYROLL_PARALLELISM", "4"))
+    
+    # Employee name search: "auto" uses pg_trgm on PostgreSQL and an
+    # in-memory index elsewhere; "memory" or "database" force one
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "auto")
+    SEARCH_INDEX_REFRESH_SECONDS: float = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+    # Full reload interval; drops deleted employees and rows the refresh missed
+    SEARCH_INDEX_REBUILD_SECONDS: float = float(os.getenv("SEARCH_INDEX_REBUILD_SECONDS", "900"))
+    
+    # Leave calendar: "auto" uses a daterange GiST index on PostgreSQL and an
+    # in-memory interval tree elsewhere; "memory" or "database" force one
+    LEAVE_CALENDAR_BACKEND: str = os.getenv("LEAVE_CALENDAR_BACKEND", "auto")
+    LEAVE_CALENDAR_REFRESH_SECONDS: float = float(os.getenv("LEAVE_CALENDAR_REFRESH_SECONDS", "300"))
+    LEAVE_CALENDAR_MAX_DAYS: int = int(os.getenv("LEAVE_CALENDAR_MAX_DAYS", "366"))
+    
+    # Yearly leave entitlements as "type:days" pairs; other types are unlimited
+    LEAVE_ENTITLEMENTS: str = os.getenv("LEAVE_ENTITLEMENTS", "annual:20,sick:10,casual:7")
+    
+    # Background health probing; readiness fails when the last probe is older
+    # than HEALTH_STALE_AFTER_SECONDS or checkouts wait longer than HEALTH_READY_MAX_WAIT_MS
+    HEALTH_PROBE_INTERVAL_SECONDS: float = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "10"))
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+    HEALTH_STALE_AFTER_SECONDS: float = float(os.getenv("HEALTH_STALE_AFTER_SECONDS", "30"))
+    HEALTH_READY_MAX_WAIT_MS: float = float(os.getenv("HEALTH_READY_MAX_WAIT_MS", "500"))
+    
+    # SQL profiling: slow-query log, N+1 detection and per-route query budgets
+    # (SQL_QUERY_BUDGET applies to routes without their own; 0 disables it).
+    # Strict mode is for development and tests: offending requests fail.
+    SQL_SLOW_QUERY_MS: float = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+    SQL_QUERY_BUDGET: int = int(os.getenv("SQL_QUERY_BUDGET", "50"))
+    SQL_PROFILER_STRICT: bool = os.getenv("SQL_PROFILER_STRICT", "false").lower() == "true"
 
 settings = Settings()
@@ -1,32 +1,180 @@
-from sqlalchemy.orm import Session
+import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+from sqlalchemy import case, event, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User, Employee
 from schemas import UserCreate, EmployeeCreate
-from auth import get_password_hash, verify_password
+from auth import UserPrincipal, get_password_hash_async, verify_and_update_password_async
+from bloom import IdentifierFilter
+from cache import TTLCache
+from config import settings
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+logger = logging.getLogger(__name__)
 
-def get_user_by_employee_id(db: Session, employee_id: str):
-    return db.query(User).filter(User.employee_id == employee_id).first()
+# Authenticated users keyed by the token "sub" claim
+user_cache = TTLCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
 
-def get_user_by_email_or_employee_id(db: Session, email_or_employee_id: str):
-    # Try to find by email first
-    user = get_user_by_email(db, email_or_employee_id)
-    if user:
-        return user
-    # If not found by email, try employee_id
-    return get_user_by_employee_id(db, email_or_employee_id)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Covers is_active and role changes made through the ORM
+    user_cache.pop(str(target.id))
 
-def authenticate_user(db: Session, email_or_employee_id: str, password: str):
-    user = get_user_by_email_or_employee_id(db, email_or_employee_id)
+# Known emails and employee IDs, lowercased
+login_filter = IdentifierFilter(
+    settings.LOGIN_FILTER_CAPACITY,
+    settings.LOGIN_FILTER_ERROR_RATE,
+    settings.LOGIN_FILTER_SYNC_INTERVAL,
+    settings.LOGIN_FILTER_REBUILD_SECONDS,
+)
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+def _add_login_identifiers(mapper, connection, target):
+    login_filter.add(target.email, target.employee_id)
+
+# Column sets for read paths that skip ORM hydration
+PRINCIPAL_COLUMNS = (
+    User.id,
+    User.email,
+    User.employee_id,
+    User.role,
+    User.is_active,
+    User.created_at,
+    User.updated_at,
+)
+EMPLOYEE_RESPONSE_COLUMNS = (
+    Employee.first_name,
+    Employee.last_name,
+    Employee.phone,
+    Employee.address,
+    Employee.department,
+    Employee.position,
+    Employee.hire_date,
+    Employee.salary,
+    Employee.id,
+    Employee.user_id,
+    Employee.created_at,
+)
+
+def dialect_insert(dialect_name: str, model):
+    """INSERT construct supporting ON CONFLICT for the session's dialect"""
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+async def sync_login_filter(db: AsyncSession):
+    """Load identifiers of users added or changed since the last sync (all users on a full load).
+
+    Ids are not handed out in commit order, and email/employee ID changes
+    keep theirs, so besides ids above the last one seen every sync re-reads
+    rows created or updated within LOGIN_FILTER_LOOKBACK_SECONDS of the
+    previous one. Rows committed later than that (a longer transaction) are
+    picked up by the full reload every LOGIN_FILTER_REBUILD_SECONDS.
+    """
+    if login_filter.needs_rebuild or not login_filter.ready:
+        login_filter.reset(await db.scalar(select(func.count(User.id))) or 0)
+    started = datetime.now(timezone.utc)
+    last_user_id = login_filter.last_user_id
+    query = select(User.id, User.email, User.employee_id)
+    if login_filter.synced_at is not None:
+        since = login_filter.synced_at - timedelta(seconds=settings.LOGIN_FILTER_LOOKBACK_SECONDS)
+        query = query.where(or_(User.id > last_user_id, User.created_at >= since, User.updated_at >= since))
+    rows = await db.stream(query.order_by(User.id).execution_options(yield_per=10000))
+    async for user_id, email, employee_id in rows:
+        login_filter.add(email, employee_id)
+        last_user_id = max(last_user_id, user_id)
+    login_filter.mark_synced(last_user_id, started)
+
+async def get_user_principal(db: AsyncSession, user_id: str):
+    """Return the cached principal for a token subject, loading it on a miss"""
+    principal = user_cache.get(user_id)
+    if principal is not None:
+        return principal
+    try:
+        user_pk = int(user_id)
+    except ValueError:
+        return None
+    user = (await db.execute(select(*PRINCIPAL_COLUMNS).where(User.id == user_pk))).first()
+    if user is None:
+        return None
+    principal = UserPrincipal.from_user(user)
+    user_cache.set(user_id, principal)
+    return principal
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def get_user_by_employee_id(db: AsyncSession, employee_id: str):
+    result = await db.execute(select(User).where(User.employee_id == employee_id))
+    return result.scalars().first()
+
+async def get_user_by_email_or_employee_id(db: AsyncSession, email_or_employee_id: str):
+    # One case-insensitive query served by idx_users_email_lower and
+    # idx_users_employee_id_lower; an email match wins over an employee ID match
+    identifier = email_or_employee_id.lower()
+    email_match = func.lower(User.email) == identifier
+    result = await db.execute(
+        select(*PRINCIPAL_COLUMNS, User.hashed_password)
+        .where(or_(email_match, func.lower(User.employee_id) == identifier))
+        .order_by(case((email_match, 0), else_=1))
+        .limit(1)
+    )
+    return result.first()
+
+async def is_known_identifier(db: AsyncSession, email_or_employee_id: str) -> bool:
+    """Bloom filter pre-check; False means the identifier definitely has no user"""
+    if not settings.LOGIN_FILTER_ENABLED:
+        return True
+    if login_filter.ready and login_filter.might_contain(email_or_employee_id):
+        return True
+    # Unknown identifier (or filter not loaded yet): catch up on users
+    # registered by other workers, at most once per sync interval. Between
+    # syncs the filter may lag them, so a miss falls through to the indexed
+    # lookup instead of rejecting a real user.
+    if not login_filter.claim_sync():
+        return True
+    await sync_login_filter(db)
+    return login_filter.might_contain(email_or_employee_id)
+
+async def authenticate_user(db: AsyncSession, email_or_employee_id: str, password: str):
+    if not await is_known_identifier(db, email_or_employee_id):
+        return False
+    user = await get_user_by_email_or_employee_id(db, email_or_employee_id)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        await upgrade_password_hash(db, user.id, user.hashed_password, new_hash)
     return user
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+async def upgrade_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str):
+    """Replace a hash of an outdated scheme or cost after a successful login.
+
+    A Core UPDATE, so the ORM listeners above don't fire; neither the cached
+    principal nor the login filter holds the hash, and updated_at (the
+    profile ETag) is left alone. Skipped if the password changed meanwhile;
+    a failure only postpones the upgrade to a later login.
+    """
+    try:
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash, updated_at=User.updated_at)
+        )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Password hash upgrade for user {user_id} failed: {e}")
+
+async def create_user(db: AsyncSession, user: UserCreate):
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         employee_id=user.employee_id,
@@ -34,19 +182,109 @@ def create_user(db: Session, user: UserCreate):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def create_employee(db: Session, employee: EmployeeCreate, user_id: int):
+async def create_employee(db: AsyncSession, employee: EmployeeCreate, user_id: int):
     db_employee = Employee(
         **employee.dict(),
         user_id=user_id
     )
     db.add(db_employee)
-    db.commit()
-    db.refresh(db_employee)
+    await db.commit()
+    await db.refresh(db_employee)
     return db_employee
 
-def get_employee_by_user_id(db: Session, user_id: int):
-    return db.query(Employee).filter(Employee.user_id == user_id).first()
+async def get_employee_profile(db: AsyncSession, user_id: int):
+    """EmployeeResponse columns (plus updated_at for the ETag) as a plain row, or None"""
+    result = await db.execute(
+        select(*EMPLOYEE_RESPONSE_COLUMNS, Employee.updated_at).where(Employee.user_id == user_id)
+    )
+    return result.first()
+
+async def get_employee_version(db: AsyncSession, user_id: int):
+    """Just (id, created_at, updated_at) of the user's employee row, for conditional GETs"""
+    result = await db.execute(
+        select(Employee.id, Employee.created_at, Employee.updated_at).where(Employee.user_id == user_id)
+    )
+    return result.first()
+
+async def get_employee_by_user_id(db: AsyncSession, user_id: int):
+    result = await db.execute(select(Employee).where(Employee.user_id == user_id))
+    return result.scalars().first()
+
+USER_COPY_COLUMNS = ["email", "employee_id", "hashed_password", "role", "is_active"]
+EMPLOYEE_COPY_COLUMNS = [
+    "user_id", "first_name", "last_name", "phone", "address",
+    "department", "position", "hire_date", "salary",
+]
+
+async def find_existing_identifiers(db: AsyncSession, emails: List[str], employee_ids: List[str]):
+    """Return the lowercased emails and employee IDs that already belong to a user"""
+    lowered_emails = [email.lower() for email in emails]
+    lowered_ids = [employee_id.lower() for employee_id in employee_ids]
+    result = await db.execute(
+        select(func.lower(User.email), func.lower(User.employee_id)).where(
+            or_(
+                func.lower(User.email).in_(lowered_emails),
+                func.lower(User.employee_id).in_(lowered_ids),
+            )
+        )
+    )
+    existing_emails, existing_ids = set(), set()
+    for email, employee_id in result:
+        existing_emails.add(email)
+        existing_ids.add(employee_id)
+    return existing_emails, existing_ids
+
+def _employee_row(employee: dict, user_id: int) -> dict:
+    row = {column: employee.get(column) for column in EMPLOYEE_COPY_COLUMNS}
+    row["user_id"] = user_id
+    if row["hire_date"] is not None and hasattr(row["hire_date"], "date"):
+        row["hire_date"] = row["hire_date"].date()
+    if row["salary"] is not None:
+        row["salary"] = Decimal(row["salary"])
+    return row
+
+async def bulk_create_users_and_employees(db: AsyncSession, users: List[dict], employees: List[dict]):
+    """Insert users and their aligned employee profiles in multi-row statements.
+
+    Uses COPY on PostgreSQL and multi-row INSERT ... RETURNING elsewhere.
+    Nothing is committed here; the caller owns the transaction and must have
+    issued a statement on the session already so COPY runs inside it.
+    """
+    conn = await db.connection()
+    if conn.dialect.name == "postgresql":
+        driver = (await conn.get_raw_connection()).driver_connection
+        await driver.copy_records_to_table(
+            "users",
+            records=[tuple(user[column] for column in USER_COPY_COLUMNS) for user in users],
+            columns=USER_COPY_COLUMNS,
+        )
+        result = await db.execute(
+            select(User.id, User.employee_id).where(
+                User.employee_id.in_([user["employee_id"] for user in users])
+            )
+        )
+    else:
+        result = await db.execute(
+            insert(User).returning(User.id, User.employee_id),
+            [{column: user[column] for column in USER_COPY_COLUMNS} for user in users],
+        )
+    user_ids = {employee_id: user_id for user_id, employee_id in result}
+    employee_rows = [
+        _employee_row(employee, user_ids[user["employee_id"]])
+        for user, employee in zip(users, employees)
+    ]
+    if conn.dialect.name == "postgresql":
+        await driver.copy_records_to_table(
+            "employees",
+            records=[tuple(row[column] for column in EMPLOYEE_COPY_COLUMNS) for row in employee_rows],
+            columns=EMPLOYEE_COPY_COLUMNS,
+        )
+    else:
+        await db.execute(insert(Employee), employee_rows)
+    # Core inserts skip ORM events, so feed the login filter directly
+    for user in users:
+        login_filter.add(user["email"], user["employee_id"])
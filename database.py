@@ -1,9 +1,15 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from config import settings
 import logging
 import os
+import threading
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,12 +37,36 @@ def get_database_url():
             else:
                 db_url += "?sslmode=require"
         
-        logger.info(f"PostgreSQL URL configured: {db_url}")
+        logger.info(f"PostgreSQL URL configured: {make_url(db_url).render_as_string(hide_password=True)}")
         return db_url
     else:
         logger.info("Using SQLite database for local development")
         return db_url
 
+# Connections each worker keeps outside its request pool: the sync engine
+# (startup DDL, scripts) and the health probe
+RESERVED_CONNECTIONS = 2
+
+def pool_limits():
+    """(pool_size, max_overflow) for this worker's request pool.
+
+    With DB_MAX_CONNECTIONS set, each of the WEB_CONCURRENCY workers gets an
+    equal share, minus its reserved connections, split between the pool and
+    overflow in the DB_POOL_SIZE:DB_MAX_OVERFLOW ratio.
+    """
+    if settings.DB_MAX_CONNECTIONS <= 0:
+        return settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    share = settings.DB_MAX_CONNECTIONS // settings.WEB_CONCURRENCY
+    request_connections = max(1, share - RESERVED_CONNECTIONS)
+    if share - RESERVED_CONNECTIONS < 1:
+        logger.warning(
+            f"DB_MAX_CONNECTIONS={settings.DB_MAX_CONNECTIONS} leaves {share} connections for each of "
+            f"{settings.WEB_CONCURRENCY} workers; the budget will be exceeded"
+        )
+    configured = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    pool_size = max(1, request_connections * settings.DB_POOL_SIZE // configured) if configured else request_connections
+    return pool_size, request_connections - pool_size
+
 def get_engine_config():
     """Get engine configuration for Railway PostgreSQL"""
     db_url = get_database_url()
@@ -50,6 +80,9 @@ def get_engine_config():
             "max_overflow": settings.DB_MAX_OVERFLOW,         # Maximum overflow connections
             "echo": False,              # Set to True for SQL query logging
         }
+        if settings.DB_MAX_CONNECTIONS > 0:
+            # Under a connection budget the sync engine only runs DDL and scripts
+            config["pool_size"], config["max_overflow"] = 1, 0
         
         # Add SSL configuration for external connections
         if "railway.internal" not in db_url:
@@ -72,27 +105,305 @@ def get_engine_config():
             "echo": False
         }
 
-# Create engine with appropriate configuration
-engine = create_engine(
-    get_database_url(),
-    **get_engine_config()
+class PoolWaitStats:
+    """Connection checkout wait times, accumulated between reads.
+
+    ``observers`` are called with every wait (used to feed metrics).
+    """
+
+    def __init__(self):
+        self.observers = []
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._count += 1
+            self._total += seconds
+            if seconds > self._max:
+                self._max = seconds
+        for observer in self.observers:
+            observer(seconds)
+
+    def take(self):
+        """Return ``(checkouts, total_wait, max_wait)`` since the previous call and reset"""
+        with self._lock:
+            snapshot = (self._count, self._total, self._max)
+            self._count, self._total, self._max = 0, 0.0, 0.0
+        return snapshot
+
+pool_wait = PoolWaitStats()
+replica_pool_wait = PoolWaitStats()
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waits for a connection"""
+
+    wait_stats = pool_wait
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - started)
+
+class ReplicaTimedAsyncQueuePool(TimedAsyncQueuePool):
+    """Timed pool of the read replica, whose waits are recorded separately"""
+
+    wait_stats = replica_pool_wait
+
+def _async_driver_url(db_url: str):
+    url = make_url(db_url)
+    if url.drivername.startswith("postgresql"):
+        # asyncpg takes SSL settings through connect_args, not the query string
+        query = {k: v for k, v in url.query.items() if k != "sslmode"}
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    return url.set(drivername="sqlite+aiosqlite")
+
+def get_async_database_url():
+    """Get the async driver URL used by the API (asyncpg or aiosqlite)"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return _async_driver_url(settings.DATABASE_URL)
+
+def replica_configured() -> bool:
+    return bool(settings.DATABASE_REPLICA_URL)
+
+def get_replica_database_url():
+    """Async driver URL of the read replica (DATABASE_REPLICA_URL)"""
+    return _async_driver_url(settings.DATABASE_REPLICA_URL)
+
+def get_async_engine_config(db_url=None, poolclass=TimedAsyncQueuePool):
+    """Get async engine configuration, mirroring get_engine_config"""
+    db_url = db_url or get_async_database_url()
+    
+    if make_url(db_url).drivername.startswith("postgresql"):
+        config = {
+            "poolclass": poolclass,
+            "pool_pre_ping": True,
+            "pool_recycle": 300,
+            "echo": False,
+        }
+        config["pool_size"], config["max_overflow"] = pool_limits()
+        connect_args = {
+            "timeout": 10,
+            "server_settings": {"application_name": "hrms_backend"},
+        }
+        # Private networking doesn't need SSL
+        if "railway.internal" not in str(db_url):
+            connect_args["ssl"] = settings.DB_SSL_MODE
+        config["connect_args"] = connect_args
+        return config
+    elif make_url(db_url).database not in (None, "", ":memory:"):
+        # File-backed SQLite: same timed queue pool, default sizing
+        return {
+            "poolclass": poolclass,
+            "echo": False
+        }
+    else:
+        return {
+            "echo": False
+        }
+
+def create_probe_engine(replica: bool = False):
+    """Separate unpooled async engine for health probes (of the primary or the replica).
+
+    Probes open their own connection instead of queueing for a slot in the
+    request pool, so a saturated pool doesn't read as a dead database.
+    """
+    db_url = get_replica_database_url() if replica else get_async_database_url()
+    config = get_async_engine_config(db_url)
+    probe_config = {"poolclass": NullPool, "echo": False}
+    if "connect_args" in config:
+        probe_config["connect_args"] = config["connect_args"]
+    return create_async_engine(db_url, **probe_config)
+
+def dialect_name() -> str:
+    """Backend name ("postgresql", "sqlite") from the configured URL, without creating an engine"""
+    return make_url(settings.DATABASE_URL).get_backend_name()
+
+# Engines are created on first use, so importing this module stays cheap and
+# never connects. ``database.engine`` (scripts and DDL) and
+# ``database.async_engine`` (the API request path) resolve through
+# get_engine() via the module __getattr__ below. The "replica" engine exists
+# only when DATABASE_REPLICA_URL is set (see replica.py).
+_engines = {}
+_engine_hooks = []
+_engine_lock = threading.RLock()
+
+def _create_engine(name: str):
+    if name == "sync":
+        return create_engine(get_database_url(), **get_engine_config())
+    if name == "async":
+        config = get_async_engine_config()
+        if "pool_size" in config:
+            logger.info(
+                f"Request pool: {config['pool_size']} connections + {config['max_overflow']} overflow "
+                f"(worker of {settings.WEB_CONCURRENCY})"
+            )
+        return create_async_engine(get_async_database_url(), **config)
+    if name == "replica":
+        if not replica_configured():
+            raise RuntimeError("DATABASE_REPLICA_URL is not set")
+        db_url = get_replica_database_url()
+        config = get_async_engine_config(db_url, poolclass=ReplicaTimedAsyncQueuePool)
+        logger.info(f"Read replica configured: {db_url.render_as_string(hide_password=True)}")
+        return create_async_engine(db_url, **config)
+    raise ValueError(f"Unknown engine {name}")
+
+def get_engine(name: str = "sync"):
+    """The "sync", "async" or "replica" engine, created on first call"""
+    created = _engines.get(name)
+    if created is None:
+        with _engine_lock:
+            created = _engines.get(name)
+            if created is None:
+                created = _engines[name] = _create_engine(name)
+                for hook in _engine_hooks:
+                    hook(name, getattr(created, "sync_engine", created))
+    return created
+
+def get_async_engine():
+    return get_engine("async")
+
+def get_replica_engine():
+    return get_engine("replica")
+
+def on_engine_created(hook):
+    """Call ``hook(name, sync_engine)`` for each engine as it is created (and for any already created).
+
+    Used to attach event listeners without forcing engine creation at import.
+    """
+    with _engine_lock:
+        _engine_hooks.append(hook)
+        for name, created in _engines.items():
+            hook(name, getattr(created, "sync_engine", created))
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine("sync")
+    if name == "async_engine":
+        return get_engine("async")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class LazySessionMaker(sessionmaker):
+    """sessionmaker that binds to its engine when the first session is made"""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self._engine_factory = engine_factory
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._engine_factory())
+        return super().__call__(**local_kw)
+
+SessionLocal = LazySessionMaker(get_engine, autocommit=False, autoflush=False)
+
+AsyncSessionLocal = LazySessionMaker(
+    get_async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions on the read replica; routes get them through replica.get_read_db
+ReplicaSessionLocal = LazySessionMaker(
+    get_replica_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def on_commit(model, snapshot, apply):
+    """Call ``apply(upserts, deleted)`` after each commit that wrote ``model`` rows.
+
+    ``snapshot(obj)`` runs at flush time, while attributes are still loaded,
+    and its results are passed as ``upserts``; ``deleted`` holds the primary
+    keys of removed rows. Changes from rolled back transactions are dropped.
+    Used to keep in-process indexes in step with this worker's own writes.
+    """
+    key = f"on_commit:{model.__name__}"
+
+    @event.listens_for(Session, "after_flush")
+    def collect(session, flush_context):
+        upserts = [snapshot(obj) for obj in list(session.new) + list(session.dirty) if isinstance(obj, model)]
+        deleted = [obj.id for obj in session.deleted if isinstance(obj, model)]
+        if upserts or deleted:
+            pending = session.info.setdefault(key, ([], []))
+            pending[0].extend(upserts)
+            pending[1].extend(deleted)
+
+    @event.listens_for(Session, "after_commit")
+    def publish(session):
+        pending = session.info.pop(key, None)
+        if pending:
+            try:
+                apply(*pending)
+            except Exception as e:
+                logger.error(f"Post-commit hook for {model.__name__} failed: {e}")
+
+    @event.listens_for(Session, "after_rollback")
+    def discard(session):
+        session.info.pop(key, None)
+
+# Alembic head revision this code expects; bump it with every new migration.
+# Kept as a constant so startup never has to import Alembic to find the head.
+SCHEMA_REVISION = "0003"
+
+class SchemaVersionError(RuntimeError):
+    """The database's Alembic stamp does not match SCHEMA_REVISION"""
+
+    def __init__(self, found):
+        super().__init__(
+            f"Database schema is at revision {found or 'none'} but the code expects {SCHEMA_REVISION}; "
+            f"run `alembic upgrade head` (after `alembic stamp 0001` for an unstamped database "
+            f"made by create_all)"
+        )
+
+async def verify_schema_revision():
+    """Check the Alembic stamp against SCHEMA_REVISION with a single query"""
+    async with get_async_engine().connect() as conn:
+        try:
+            found = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except (OperationalError, ProgrammingError):
+            found = None  # never stamped
+    if found != SCHEMA_REVISION:
+        raise SchemaVersionError(found)
 
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables.
+
+    create_all only adds missing tables, never the index changes later
+    migrations make, so a database that already has tables must carry the
+    current Alembic stamp. A new database is created at SCHEMA_REVISION and
+    stamped with it.
+    """
     try:
-        Base.metadata.create_all(bind=engine)
+        with get_engine().begin() as conn:
+            inspector = inspect(conn)
+            fresh = not inspector.has_table("users")
+            stamped = inspector.has_table("alembic_version")
+            if not fresh:
+                found = conn.execute(text("SELECT version_num FROM alembic_version")).scalar() if stamped else None
+                if found != SCHEMA_REVISION:
+                    raise SchemaVersionError(found)
+            Base.metadata.create_all(bind=conn)
+            if fresh and not stamped:
+                conn.execute(text(
+                    "CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL, "
+                    "CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))"
+                ))
+                conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"),
+                             {"revision": SCHEMA_REVISION})
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
@@ -101,6 +412,7 @@ def init_db():
 def test_connection():
     """Test database connection"""
     try:
+        engine = get_engine()
         with engine.connect() as conn:
             if engine.dialect.name == "postgresql":
                 result = conn.execute("SELECT version()")
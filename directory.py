@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import Employee
+
+DIRECTORY_COLUMNS = (
+    Employee.id,
+    Employee.user_id,
+    Employee.first_name,
+    Employee.last_name,
+    Employee.department,
+    Employee.position,
+    Employee.hire_date,
+)
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor can't be decoded"""
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(last_id, int):
+        raise InvalidCursorError("Invalid cursor")
+    return last_id
+
+def build_directory_query(
+    after_id: Optional[int],
+    limit: int,
+    department: Optional[str] = None,
+    position: Optional[str] = None,
+    hired_from: Optional[date] = None,
+    hired_to: Optional[date] = None,
+):
+    """Keyset page ordered by id: WHERE <filters> AND id > :cursor ORDER BY id LIMIT n.
+
+    Equality filters are served by (department, id) / (position, id), so a
+    page is an in-order index range scan no matter how deep the cursor is.
+    One extra row is fetched to know whether another page exists.
+    """
+    query = select(*DIRECTORY_COLUMNS)
+    if department is not None:
+        query = query.where(Employee.department == department)
+    if position is not None:
+        query = query.where(Employee.position == position)
+    if hired_from is not None:
+        query = query.where(Employee.hire_date >= hired_from)
+    if hired_to is not None:
+        query = query.where(Employee.hire_date <= hired_to)
+    if after_id is not None:
+        query = query.where(Employee.id > after_id)
+    return query.order_by(Employee.id).limit(limit + 1)
+
+async def fetch_directory_page(query, limit: int, session_factory=AsyncSessionLocal) -> dict:
+    """Run a directory page query and return ``{"items": [...], "next_cursor": ...}``.
+
+    The page (at most limit + 1 rows) is read in full and the connection
+    returned to the pool before anything is sent, so a slow client never
+    holds a pooled connection and a database error still gets a proper 500.
+    """
+    async with session_factory() as db:
+        rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [row._asdict() for row in rows],
+        "next_cursor": encode_cursor(rows[-1].id) if has_more else None,
+    }
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator.
+
+Fills the database at DATABASE_URL with N users and employees and years of
+attendance, leave and payroll history with realistic distributions:
+weighted departments and positions, most days present with some late,
+half-day and absent days, leaves within entitlements (approved leave days
+have no attendance row), and paid payroll computed from the generated
+absences with payroll.compute_payroll. Rows are bulk loaded with COPY on
+PostgreSQL and batched executemany elsewhere; the monthly attendance
+rollups and leave balance ledger are rebuilt afterwards.
+
+Output depends only on the arguments, so pass --end-date for a dataset
+that is reproducible across days. Roughly 250 attendance rows are made per
+employee-year, so one million rows is about --employees 2000 --years 2.
+
+    python generate_dataset.py --employees 2000 --years 2 --seed 42
+    python generate_dataset.py --seed 42 --reset   # remove that seed's data
+"""
+
+import argparse
+import asyncio
+import bisect
+import calendar
+import csv
+import io
+import itertools
+import logging
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import delete, func, select, text
+
+from auth import get_password_hash
+from database import Base, engine
+from leave_balances import ENTITLEMENTS, rebuild_balances, split_by_year, weekdays_between
+from models import Attendance, AttendanceMonthlySummary, Employee, Leave, LeaveBalance, Payroll, User
+from payroll import compute_payroll, working_days
+from rollups import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = "password123"  # every generated account shares one hash; bcrypt per row would dominate the run
+BATCH_SIZE = 50000
+
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Akira", "Alex", "Amara", "Ana", "Arjun", "Ava", "Ben", "Chen", "Chloe", "Daniel",
+    "Deepa", "Diego", "Elena", "Emma", "Fatima", "Felix", "Grace", "Hana", "Ian", "Isabel", "Jamal", "Jin",
+    "Julia", "Kavya", "Kenji", "Lara", "Leo", "Li", "Lucas", "Maya", "Mei", "Mohammed", "Nadia", "Noah",
+    "Olivia", "Omar", "Priya", "Rahul", "Rosa", "Sakura", "Sam", "Sara", "Sofia", "Tariq", "Uma", "Victor",
+    "Wei", "Yusuf", "Zara", "Ravi", "Sneha", "Kiran", "Lakshmi", "Vikram", "Anjali", "Suresh", "Meera", "Raju",
+)
+LAST_NAMES = (
+    "Acharya", "Ahmed", "Anderson", "Bauer", "Brown", "Chen", "Costa", "Das", "Dubois", "Fernandez", "Garcia",
+    "Gupta", "Hansen", "Ito", "Iyer", "Jones", "Kapoor", "Khan", "Kim", "Kumar", "Lee", "Lopez", "Martin",
+    "Mehta", "Muller", "Nair", "Nguyen", "Okafor", "Patel", "Pereira", "Rao", "Reddy", "Rossi", "Sato",
+    "Schmidt", "Shah", "Singh", "Smith", "Tanaka", "Taylor", "Wang", "Williams", "Wilson", "Yamamoto", "Zhang",
+)
+# department: (weight, [(position, weight, monthly base salary)])
+DEPARTMENTS = {
+    "Engineering": (30, [("Software Engineer", 50, 9000), ("Senior Engineer", 25, 12500),
+                         ("QA Engineer", 15, 7000), ("Engineering Manager", 10, 16000)]),
+    "Sales": (18, [("Sales Representative", 60, 5500), ("Account Executive", 30, 8000), ("Sales Manager", 10, 11000)]),
+    "Operations": (15, [("Operations Associate", 60, 4500), ("Operations Analyst", 30, 6000),
+                        ("Operations Manager", 10, 9500)]),
+    "Support": (12, [("Support Specialist", 70, 4000), ("Support Lead", 20, 5500), ("Support Manager", 10, 8000)]),
+    "Marketing": (8, [("Marketing Specialist", 60, 6000), ("Content Strategist", 25, 6500),
+                      ("Marketing Manager", 15, 10000)]),
+    "Finance": (8, [("Accountant", 60, 6500), ("Financial Analyst", 30, 8000), ("Finance Manager", 10, 12000)]),
+    "Human Resources": (5, [("HR Generalist", 60, 5500), ("Recruiter", 25, 5000), ("HR Manager", 15, 9000)]),
+    "Legal": (4, [("Paralegal", 50, 5000), ("Counsel", 40, 13000), ("General Counsel", 10, 18000)]),
+}
+ATTENDANCE_STATUSES = (("present", 85), ("late", 8), ("half-day", 3), ("absent", 4))
+LEAVE_TYPES = (("annual", 45), ("sick", 30), ("casual", 20), ("unpaid", 5))
+LEAVE_LENGTHS = {"annual": (1, 10), "sick": (1, 3), "casual": (1, 2), "unpaid": (1, 5)}
+
+MonthKey = Tuple[int, int, int]  # (employee_id, year, month)
+
+class BulkWriter:
+    """Loads rows of plain values into a table over one raw DBAPI connection.
+
+    PostgreSQL gets CSV through COPY; other databases get batched
+    executemany, with each column's SQLAlchemy bind processor applied so
+    stored values match what the ORM would write.
+    """
+
+    def __init__(self, raw_connection, dialect, batch_size: int = BATCH_SIZE):
+        self.raw = raw_connection
+        self.dialect = dialect
+        self.batch_size = batch_size
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def write(self, table, columns: Sequence[str], rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(table, columns, batch)
+                batch = []
+        if batch:
+            self._flush(table, columns, batch)
+
+    def _flush(self, table, columns, batch):
+        started = time.perf_counter()
+        quote = self.dialect.identifier_preparer.quote
+        column_list = ", ".join(quote(column) for column in columns)
+        cursor = self.raw.cursor()
+        try:
+            if self.dialect.name == "postgresql" and hasattr(cursor, "copy_expert"):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)  # None becomes an unquoted empty field, i.e. NULL
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {quote(table.name)} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+            else:
+                processors = [
+                    table.c[column].type.dialect_impl(self.dialect).bind_processor(self.dialect) for column in columns
+                ]
+                if any(processors):
+                    batch = [
+                        tuple(process(value) if process else value for process, value in zip(processors, row))
+                        for row in batch
+                    ]
+                marker = "%s" if self.dialect.paramstyle in ("format", "pyformat") else "?"
+                placeholders = ", ".join([marker] * len(columns))
+                cursor.executemany(f"INSERT INTO {quote(table.name)} ({column_list}) VALUES ({placeholders})", batch)
+        finally:
+            cursor.close()
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(batch)
+        self.seconds[table.name] = self.seconds.get(table.name, 0.0) + time.perf_counter() - started
+
+def employee_id_prefix(seed: int) -> str:
+    return f"GEN{seed}-"
+
+def _weighted(options):
+    return [option for option, _ in options], [weight for _, weight in options]
+
+def _at(day: date, minutes: float) -> datetime:
+    return datetime.combine(day, dt_time(), tzinfo=timezone.utc) + timedelta(minutes=minutes)
+
+def _month_end(year: int, month: int) -> date:
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+class DatasetGenerator:
+    def __init__(self, employees: int, start: date, end: date, seed: int, writer: BulkWriter):
+        self.employees = employees
+        self.start = start
+        self.end = end
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.writer = writer
+        self.prefix = employee_id_prefix(seed)
+        self.weekdays = [
+            start + timedelta(days=offset)
+            for offset in range((end - start).days + 1)
+            if (start + timedelta(days=offset)).weekday() < 5
+        ]
+        # Filled while generating and consumed by later tables
+        self.approvers: List[int] = []
+        self.leave_days: Dict[int, set] = {}
+        self.unpaid_days: Dict[MonthKey, int] = {}
+        self.absences: Dict[MonthKey, List[int]] = {}
+
+    def people(self) -> List[dict]:
+        """Users and their employee profiles, before ids are known"""
+        rng = self.rng
+        departments = list(DEPARTMENTS)
+        department_weights = [DEPARTMENTS[name][0] for name in departments]
+        people = []
+        for n in range(self.employees):
+            department = rng.choices(departments, department_weights)[0]
+            positions = DEPARTMENTS[department][1]
+            position, _, base = rng.choices(positions, [weight for _, weight, _ in positions])[0]
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            # Tenure skews recent; a fifth of staff joined during the generated window
+            if rng.random() < 0.2:
+                hire_date = self.start + timedelta(days=rng.randrange((self.end - self.start).days + 1))
+            else:
+                hire_date = self.start - timedelta(days=int(rng.expovariate(1 / 900)) + 1)
+            if department == "Human Resources":
+                role = "hr"
+            elif position.endswith("Manager") or position == "General Counsel":
+                role = "manager"
+            else:
+                role = "employee"
+            people.append({
+                "employee_id": f"{self.prefix}{n:07d}",
+                "email": f"{first}.{last}.{self.seed}.{n}@example.com".lower(),
+                "role": role,
+                "first_name": first,
+                "last_name": last,
+                "phone": f"+1-555-{rng.randrange(10000):04d}",
+                "department": department,
+                "position": position,
+                "hire_date": hire_date,
+                "salary": round(base * rng.lognormvariate(0, 0.12), -1),
+            })
+        return people
+
+    def write_people(self, people: List[dict]) -> List[Tuple[int, dict]]:
+        password_hash = get_password_hash(PASSWORD)
+        self.writer.write(User.__table__, ("email", "employee_id", "hashed_password", "role", "is_active", "created_at"), (
+            (p["email"], p["employee_id"], password_hash, p["role"], True, _at(p["hire_date"], 8 * 60))
+            for p in people
+        ))
+        user_ids = self._ids(select(User.employee_id, User.id).where(User.employee_id.like(f"{self.prefix}%")))
+        self.writer.write(
+            Employee.__table__,
+            ("user_id", "first_name", "last_name", "phone", "department", "position", "hire_date", "salary",
+             "created_at"),
+            (
+                (user_ids[p["employee_id"]], p["first_name"], p["last_name"], p["phone"], p["department"],
+                 p["position"], p["hire_date"], p["salary"], _at(p["hire_date"], 8 * 60))
+                for p in people
+            ),
+        )
+        employee_ids = self._ids(
+            select(User.employee_id, Employee.id)
+            .join(Employee, Employee.user_id == User.id)
+            .where(User.employee_id.like(f"{self.prefix}%"))
+        )
+        self.approvers = sorted(user_ids[p["employee_id"]] for p in people if p["role"] in ("hr", "manager"))
+        if not self.approvers:
+            self.approvers = [min(user_ids.values())]
+        return [(employee_ids[p["employee_id"]], p) for p in people]
+
+    def _ids(self, query) -> Dict[str, int]:
+        cursor = self.writer.raw.cursor()
+        try:
+            compiled = query.compile(dialect=self.writer.dialect)
+            params = compiled.construct_params()
+            if compiled.positional:
+                params = tuple(params[name] for name in compiled.positiontup)
+            cursor.execute(str(compiled), params)
+            return {key: value for key, value in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def leaves(self, staff: List[Tuple[int, dict]]):
+        rng = self.rng
+        types, weights = _weighted(LEAVE_TYPES)
+        recent = self.end - timedelta(days=30)
+        for employee_id, person in staff:
+            first_day = max(self.start, person["hire_date"])
+            if first_day > self.end:
+                continue
+            taken: List[Tuple[date, date]] = []
+            reserved: Dict[Tuple[str, int], int] = {}
+            for year in range(first_day.year, self.end.year + 1):
+                year_start, year_end = max(first_day, date(year, 1, 1)), min(self.end, date(year, 12, 31))
+                span = (year_end - year_start).days
+                for _ in range(rng.choices((0, 1, 2, 3, 4, 5, 6), (5, 10, 20, 25, 20, 12, 8))[0]):
+                    leave_type = rng.choices(types, weights)[0]
+                    low, high = LEAVE_LENGTHS[leave_type]
+                    start = year_start + timedelta(days=rng.randint(0, span))
+                    while start.weekday() >= 5:
+                        start += timedelta(days=1)
+                    end = start
+                    for _ in range(rng.randint(low, high) - 1):
+                        end += timedelta(days=3 if end.weekday() == 4 else 1)
+                    if end > self.end or any(start <= e and s <= end for s, e in taken):
+                        continue
+                    days_by_year = split_by_year(start, end)
+                    entitled = ENTITLEMENTS.get(leave_type)
+                    if entitled is not None and any(
+                        reserved.get((leave_type, y), 0) + days > entitled for y, days in days_by_year.items()
+                    ):
+                        continue
+                    if start > recent and rng.random() < 0.6:
+                        status = "pending"
+                    else:
+                        status = "approved" if rng.random() < 0.88 else "rejected"
+                    requested_at = _at(start - timedelta(days=rng.randint(1, 30)), rng.randint(9 * 60, 18 * 60))
+                    approved_by = approved_at = None
+                    if status != "pending":
+                        approved_by = rng.choice(self.approvers)
+                        approved_at = requested_at + timedelta(hours=rng.randint(1, 72))
+                    if status != "rejected":
+                        taken.append((start, end))
+                        for y, days in days_by_year.items():
+                            reserved[(leave_type, y)] = reserved.get((leave_type, y), 0) + days
+                    if status == "approved":
+                        self._record_absence(employee_id, leave_type, start, end)
+                    yield (
+                        employee_id, leave_type, start, end, weekdays_between(start, end),
+                        f"{leave_type.capitalize()} leave", status, approved_by, approved_at, requested_at,
+                    )
+
+    def _record_absence(self, employee_id: int, leave_type: str, start: date, end: date):
+        days = self.leave_days.setdefault(employee_id, set())
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                days.add(day)
+                if leave_type == "unpaid":
+                    key = (employee_id, day.year, day.month)
+                    self.unpaid_days[key] = self.unpaid_days.get(key, 0) + 1
+            day += timedelta(days=1)
+
+    def attendance(self, staff: List[Tuple[int, dict]]):
+        rng = self.rng
+        statuses, weights = _weighted(ATTENDANCE_STATUSES)
+        for employee_id, person in staff:
+            on_leave = self.leave_days.get(employee_id, ())
+            # Everyone has their own reliability, so late/absent rates vary per employee
+            reliability = rng.lognormvariate(0, 0.5)
+            cumulative = list(itertools.accumulate(
+                weight if status == "present" else weight * reliability for status, weight in zip(statuses, weights)
+            ))
+            total = cumulative[-1]
+            for day in self.weekdays[bisect.bisect_left(self.weekdays, person["hire_date"]):]:
+                if day in on_leave:
+                    continue
+                status = statuses[bisect.bisect_right(cumulative, rng.random() * total)]
+                check_in = check_out = None
+                if status != "absent":
+                    arrival = rng.gauss(9 * 60 - 5, 8) if status != "late" else rng.uniform(9 * 60 + 16, 10 * 60 + 30)
+                    shift = rng.gauss(4 * 60, 20) if status == "half-day" else rng.gauss(8.5 * 60, 25)
+                    check_in = _at(day, arrival)
+                    check_out = check_in + timedelta(minutes=shift)
+                if status in ("absent", "half-day"):
+                    counts = self.absences.setdefault((employee_id, day.year, day.month), [0, 0])
+                    counts[0 if status == "absent" else 1] += 1
+                yield employee_id, day, check_in, check_out, status, check_out or _at(day, 18 * 60)
+
+    def payroll(self, staff: List[Tuple[int, dict]]):
+        # Only months wholly inside the window, so absences are complete
+        first = self.start if self.start.day == 1 else _month_end(self.start.year, self.start.month) + timedelta(days=1)
+        year, month = first.year, first.month
+        while _month_end(year, month) <= self.end:
+            last = _month_end(year, month)
+            employed = [(employee_id, p) for employee_id, p in staff if p["hire_date"] <= date(year, month, 1)]
+            if employed:
+                keys = [(employee_id, year, month) for employee_id, _ in employed]
+                result = compute_payroll({
+                    "employee_id": [employee_id for employee_id, _ in employed],
+                    "salary": [p["salary"] for _, p in employed],
+                    "absent_days": [self.absences.get(key, (0, 0))[0] for key in keys],
+                    "half_days": [self.absences.get(key, (0, 0))[1] for key in keys],
+                    "unpaid_leave_days": [self.unpaid_days.get(key, 0) for key in keys],
+                }, working_days(year, month))
+                paid_at = _at(last, 12 * 60)
+                yield from (
+                    (employee_id, month, year, basic, allowance, deduction, net, last, "paid", paid_at)
+                    for employee_id, basic, allowance, deduction, net in zip(
+                        result["employee_id"], result["basic_salary"], result["allowances"],
+                        result["deductions"], result["net_salary"],
+                    )
+                )
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def run(self):
+        staff = self.write_people(self.people())
+        logger.info(f"Wrote {len(staff)} users and employees")
+        self.writer.write(Leave.__table__, (
+            "employee_id", "leave_type", "start_date", "end_date", "days_requested", "reason", "status",
+            "approved_by", "approved_at", "created_at",
+        ), self.leaves(staff))
+        logger.info(f"Wrote {self.writer.counts.get('leaves', 0)} leaves")
+        self.writer.write(
+            Attendance.__table__,
+            ("employee_id", "date", "check_in", "check_out", "status", "created_at"),
+            self.attendance(staff),
+        )
+        logger.info(f"Wrote {self.writer.counts.get('attendance', 0)} attendance rows")
+        self.writer.write(Payroll.__table__, (
+            "employee_id", "month", "year", "basic_salary", "allowances", "deductions", "net_salary",
+            "payment_date", "status", "created_at",
+        ), self.payroll(staff))
+        logger.info(f"Wrote {self.writer.counts.get('payroll', 0)} payroll rows")
+
+def reset(seed: int) -> int:
+    """Delete everything generated with ``seed``"""
+    generated_users = select(User.id).where(User.employee_id.like(f"{employee_id_prefix(seed)}%"))
+    generated_employees = select(Employee.id).where(Employee.user_id.in_(generated_users))
+    with engine.begin() as conn:
+        for model in (Attendance, Leave, Payroll, AttendanceMonthlySummary, LeaveBalance):
+            conn.execute(delete(model).where(model.employee_id.in_(generated_employees)))
+        conn.execute(delete(Employee).where(Employee.user_id.in_(generated_users)))
+        return conn.execute(delete(User).where(User.id.in_(generated_users))).rowcount
+
+async def rebuild_derived() -> Tuple[int, int]:
+    return await rebuild_rollups(), await rebuild_balances()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic HRMS dataset in DATABASE_URL")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=2, help="years of history ending at --end-date")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD (default today)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--reset", action="store_true", help="delete the data generated with --seed and exit")
+    parser.add_argument("--skip-derived", action="store_true", help="do not rebuild rollups and leave balances")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.reset:
+        logger.info(f"Deleted {reset(args.seed)} generated users and their data")
+        return
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existing = conn.execute(
+            select(func.count()).select_from(User).where(User.employee_id.like(f"{employee_id_prefix(args.seed)}%"))
+        ).scalar()
+    if existing:
+        parser.error(f"{existing} users from seed {args.seed} already exist; use --reset or another --seed")
+
+    end = args.end_date
+    start = date(end.year - args.years, end.month, min(end.day, 28)) + timedelta(days=1)
+    started = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        if engine.dialect.name == "sqlite":
+            raw.cursor().execute("PRAGMA synchronous = OFF")
+        writer = BulkWriter(raw, engine.dialect, args.batch_size)
+        DatasetGenerator(args.employees, start, end, args.seed, writer).run()
+        raw.commit()
+    finally:
+        raw.close()
+    loaded = time.perf_counter() - started
+    for table, count in writer.counts.items():
+        seconds = writer.seconds[table]
+        logger.info(f"{table}: {count} rows, {seconds:.1f}s writing ({count / seconds if seconds else 0:.0f} rows/s)")
+    logger.info(f"Generated {start} to {end} in {loaded:.1f}s")
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    if not args.skip_derived:
+        summaries, balances = asyncio.run(rebuild_derived())
+        logger.info(f"Rebuilt {summaries} attendance summaries and {balances} leave balances")
+    logger.info(f"Done in {time.perf_counter() - started:.1f}s; every generated account's password is {PASSWORD!r}")
+
+if __name__ == "__main__":
+    main()
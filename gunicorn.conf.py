@@ -0,0 +1,69 @@
+"""
+Production launcher: gunicorn master with uvicorn workers.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+WEB_CONCURRENCY workers (default: one per core) are forked from a master
+that has already imported the app, so workers start without re-importing.
+Nothing connects at import (engines, pools and background tasks start in
+each worker), so no connection or task crosses the fork. Each worker's
+share of DB_MAX_CONNECTIONS and HASH_WORKERS is derived from
+WEB_CONCURRENCY in config.py. Workers are recycled after MAX_REQUESTS
+requests (with jitter so they don't restart together) and given
+GRACEFUL_TIMEOUT seconds to finish in-flight requests.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Exported before the app is preloaded, so config.py sees the worker count
+os.environ.setdefault("WEB_CONCURRENCY", str(multiprocessing.cpu_count()))
+workers = int(os.environ["WEB_CONCURRENCY"])
+
+# Metrics from several workers are aggregated through files. The directory
+# is set and emptied here, before the preloaded app imports prometheus_client;
+# values left by a previous run would otherwise be added to this run's
+if workers > 1:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "hrms-prometheus"))
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# Per-IP login limits key on the client address. X-Forwarded-For is only
+# honoured from the peers in FORWARDED_ALLOW_IPS (read by gunicorn itself,
+# default loopback): set it to the load balancer's address range, and the
+# right-most address not in that range becomes the client. Never use "*":
+# the client-supplied left-most entry would be trusted
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", str(max_requests // 10)))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+def on_starting(server):
+    # With DB_STARTUP_MODE=create_all, create tables once here rather than
+    # concurrently in every worker; workers inherit the switch to "skip"
+    from config import settings
+    if settings.DB_STARTUP_MODE != "create_all":
+        return
+    from database import SchemaVersionError, get_engine, init_db
+    try:
+        init_db()
+    except SchemaVersionError:
+        raise  # no worker could fix the schema either; refuse to start
+    except Exception as e:
+        server.log.error(f"Database initialization failed, workers will retry: {e}")
+        return
+    get_engine().dispose()  # no pooled connection may cross the fork
+    settings.DB_STARTUP_MODE = "skip"
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from config import settings
+from database import create_probe_engine, get_engine, pool_wait, replica_configured, replica_pool_wait
+
+logger = logging.getLogger(__name__)
+
+def pool_stats(pool) -> dict:
+    """Point-in-time counters of a SQLAlchemy pool (None where the pool type has no such counter)"""
+    stats = {
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "checked_out": None,
+        "checked_in": None,
+        "overflow": None,
+        "max_overflow": None,
+        "saturated": False,
+    }
+    if not hasattr(pool, "checkedout"):
+        return stats
+    stats["size"] = pool.size()
+    stats["checked_out"] = pool.checkedout()
+    stats["checked_in"] = pool.checkedin()
+    stats["overflow"] = max(pool.overflow(), 0)
+    max_overflow = getattr(pool, "_max_overflow", -1)
+    stats["max_overflow"] = max_overflow
+    if max_overflow >= 0:
+        stats["saturated"] = stats["checked_out"] >= stats["size"] + max_overflow
+    return stats
+
+class HealthMonitor:
+    """Probes the database in the background and serves the cached result.
+
+    Health endpoints only read this state, so they never take a slot from
+    the request pool. The probe itself runs on a separate unpooled engine.
+    With ``replica=True`` it watches the read replica instead, which also
+    counts as down while it lags more than REPLICA_MAX_LAG_SECONDS behind.
+    """
+
+    def __init__(self, interval: float, timeout: float, replica: bool = False):
+        self.interval = interval
+        self.timeout = timeout
+        self.replica = replica
+        self.name = "Replica" if replica else "Database"
+        self.database_ok: Optional[bool] = None
+        self.error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[datetime] = None
+        self.consecutive_failures = 0
+        self.pool_wait = {"checkouts": 0, "avg_ms": 0.0, "max_ms": 0.0}
+        self._checked_monotonic: Optional[float] = None
+        self._engine = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _select_one(self):
+        async with self._engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            if self.replica and conn.dialect.name == "postgresql":
+                # Zero once everything received has been replayed, even if the primary is idle
+                lag = (await conn.execute(text(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                ))).scalar()
+                if lag is not None and lag > settings.REPLICA_MAX_LAG_SECONDS:
+                    raise RuntimeError(f"replica is {float(lag):.1f}s behind the primary")
+
+    async def probe(self):
+        if self._engine is None:
+            self._engine = create_probe_engine(replica=self.replica)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._select_one(), timeout=self.timeout)
+        except Exception as e:
+            if self.database_ok is not False:
+                logger.error(f"{self.name} health probe failed: {e!r}")
+            self.database_ok = False
+            self.error = repr(e)
+            self.consecutive_failures += 1
+        else:
+            if self.database_ok is False:
+                logger.info(f"{self.name} health probe recovered")
+            self.database_ok = True
+            self.error = None
+            self.consecutive_failures = 0
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.checked_at = datetime.now(timezone.utc)
+        self._checked_monotonic = time.monotonic()
+
+        checkouts, total_wait, max_wait = (replica_pool_wait if self.replica else pool_wait).take()
+        self.pool_wait = {
+            "checkouts": checkouts,
+            "avg_ms": round(total_wait / checkouts * 1000, 2) if checkouts else 0.0,
+            "max_ms": round(max_wait * 1000, 2),
+        }
+
+    def mark_failed(self, error: Exception):
+        """Record a connection failure seen outside the probe; the next probe decides recovery"""
+        if self.database_ok is not False:
+            logger.error(f"{self.name} connection failed: {error!r}")
+        self.database_ok = False
+        self.error = repr(error)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe()
+
+    async def start(self):
+        """Probe once so the first health read has data, then keep probing in the background"""
+        await self.probe()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        if self._checked_monotonic is None:
+            return None
+        return round(time.monotonic() - self._checked_monotonic, 3)
+
+    def snapshot(self) -> dict:
+        return {
+            "database_ok": self.database_ok,
+            "error": self.error,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "age_seconds": self.age_seconds,
+            "consecutive_failures": self.consecutive_failures,
+            "pool": {**pool_stats(get_engine("replica" if self.replica else "async").pool), "wait": self.pool_wait},
+        }
+
+    def readiness(self) -> Tuple[bool, List[str], dict]:
+        """(ready, reasons it isn't, snapshot) from cached state only"""
+        snapshot = self.snapshot()
+        reasons = []
+        if not self.database_ok:
+            reasons.append("database unreachable" if self.database_ok is False else "not probed yet")
+        elif snapshot["age_seconds"] > settings.HEALTH_STALE_AFTER_SECONDS:
+            reasons.append("health probe is stale")
+        if snapshot["pool"]["saturated"]:
+            reasons.append("connection pool saturated")
+        if self.pool_wait["avg_ms"] > settings.HEALTH_READY_MAX_WAIT_MS:
+            reasons.append("connection checkouts are queueing")
+        return not reasons, reasons, snapshot
+
+health_monitor = HealthMonitor(settings.HEALTH_PROBE_INTERVAL_SECONDS, settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+replica_monitor = HealthMonitor(
+    settings.HEALTH_PROBE_INTERVAL_SECONDS, settings.HEALTH_PROBE_TIMEOUT_SECONDS, replica=True
+) if replica_configured() else None
@@ -0,0 +1,259 @@
+import asyncio
+import contextvars
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from itertools import islice
+from typing import BinaryIO, Iterator, List, Optional, Set, Tuple
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import get_password_hashes_async
+from config import settings
+from crud import bulk_create_users_and_employees, find_existing_identifiers
+from database import AsyncSessionLocal
+from models import ImportJob
+from schemas import EmployeeCreate, UserCreate
+from search import name_index, refresh_name_index
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = ("email", "employee_id", "password", "role")
+EMPLOYEE_FIELDS = tuple(EmployeeCreate.__fields__)
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Pick the parser from the upload's extension or content type (CSV by default)"""
+    name = (filename or "").lower()
+    kind = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in kind or "jsonl" in kind:
+        return "ndjson"
+    return "csv"
+
+def iter_records(fileobj, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield ``(row_number, record, parse_error)`` one row at a time"""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            yield number, {
+                key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                for key, value in record.items()
+                if key
+            }, None
+        return
+    for number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, record, None
+
+def _take(records: Iterator, count: int) -> list:
+    return list(islice(records, count))
+
+def _format_errors(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    ]
+
+def validate_record(record: dict):
+    """Validate one row against UserCreate and EmployeeCreate"""
+    errors = []
+    user = employee = None
+    try:
+        user = UserCreate(**{field: record.get(field) for field in USER_FIELDS})
+    except ValidationError as e:
+        errors.extend(_format_errors(e))
+    try:
+        employee = EmployeeCreate(**{
+            field: record[field] for field in EMPLOYEE_FIELDS if record.get(field) is not None
+        })
+    except ValidationError as e:
+        errors.extend(_format_errors(e))
+    return user, employee, errors
+
+async def _drop_registered(db: AsyncSession, rows: list, errors: list) -> list:
+    """Rows whose email and employee ID are both unused; the rest get an error entry"""
+    existing_emails, existing_ids = await find_existing_identifiers(
+        db, [user.email for _, user, _ in rows], [user.employee_id for _, user, _ in rows]
+    )
+    kept = []
+    for number, user, employee in rows:
+        row_errors = []
+        if user.email.lower() in existing_emails:
+            row_errors.append("email: already registered")
+        if user.employee_id.lower() in existing_ids:
+            row_errors.append("employee_id: already registered")
+        if row_errors:
+            errors.append({"row": number, "errors": row_errors})
+        else:
+            kept.append((number, user, employee))
+    return kept
+
+async def import_employees(db: AsyncSession, fileobj: BinaryIO, fmt: str, batch_size: Optional[int] = None) -> dict:
+    """Stream a CSV or NDJSON file into users and employees, one transaction per batch"""
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    records = iter_records(fileobj, fmt)
+    seen_emails, seen_ids = set(), set()
+    total = created = 0
+    errors = []
+
+    while True:
+        batch = await run_in_threadpool(_take, records, batch_size)
+        if not batch:
+            break
+
+        valid = []
+        for number, record, parse_error in batch:
+            total += 1
+            if parse_error:
+                errors.append({"row": number, "errors": [parse_error]})
+                continue
+            user, employee, row_errors = validate_record(record)
+            if row_errors:
+                errors.append({"row": number, "errors": row_errors})
+                continue
+            email, employee_id = user.email.lower(), user.employee_id.lower()
+            if email in seen_emails or employee_id in seen_ids:
+                errors.append({"row": number, "errors": ["duplicate email or employee ID in file"]})
+                continue
+            seen_emails.add(email)
+            seen_ids.add(employee_id)
+            valid.append((number, user, employee))
+        if not valid:
+            continue
+
+        rows = await _drop_registered(db, valid, errors)
+        # End the check's transaction so no pooled connection is held while hashing
+        await db.rollback()
+        if not rows:
+            continue
+
+        hashes = await get_password_hashes_async([user.password for _, user, _ in rows])
+        hashed = dict(zip((number for number, _, _ in rows), hashes))
+        try:
+            # Re-check inside the short insert transaction: identifiers may
+            # have been registered elsewhere while this batch was hashing
+            rows = await _drop_registered(db, rows, errors)
+            if rows:
+                users = [
+                    {
+                        "email": user.email,
+                        "employee_id": user.employee_id,
+                        "hashed_password": hashed[number],
+                        "role": user.role,
+                        "is_active": True,
+                    }
+                    for number, user, _ in rows
+                ]
+                employees = [employee.dict() for _, _, employee in rows]
+                await bulk_create_users_and_employees(db, users, employees)
+            await db.commit()
+            created += len(rows)
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Employee import batch failed: {e}")
+            for number, _, _ in rows:
+                errors.append({"row": number, "errors": [f"batch insert failed: {e.__class__.__name__}"]})
+
+    # Core bulk inserts skip the ORM commit hook; catch the name index up now
+    # rather than waiting for the periodic refresh
+    if created and name_index.loaded:
+        await refresh_name_index()
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "total_rows": total,
+        "created": created,
+        "failed": total - created,
+        "errors": errors,
+    }
+
+# Jobs of this worker, so shutdown can cancel them; at most
+# IMPORT_MAX_RUNNING_JOBS run at once per worker, the rest wait as "queued"
+_job_tasks: Set[asyncio.Task] = set()
+_job_slots = asyncio.Semaphore(settings.IMPORT_MAX_RUNNING_JOBS)
+
+def _spool(fileobj) -> str:
+    """Copy the upload to a file of our own; the request's upload is closed once it returns"""
+    with tempfile.NamedTemporaryFile(prefix="hrms-import-", delete=False) as spool:
+        shutil.copyfileobj(fileobj, spool)
+    return spool.name
+
+async def _update_job(job_id: str, **values):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(ImportJob).where(ImportJob.id == job_id).values(**values))
+        await db.commit()
+
+async def run_import_job(job_id: str, path: str, fmt: str):
+    """Import a spooled upload and record the outcome on its job row"""
+    try:
+        async with _job_slots:
+            await _update_job(job_id, status="running", started_at=datetime.now(timezone.utc))
+            async with AsyncSessionLocal() as db:
+                with open(path, "rb") as fileobj:
+                    report = await import_employees(db, fileobj, fmt)
+            await _update_job(
+                job_id, status="completed", report=json.dumps(report), finished_at=datetime.now(timezone.utc)
+            )
+            logger.info(f"Employee import job {job_id}: {report['created']} created, {report['failed']} failed")
+    except asyncio.CancelledError:
+        await _update_job(job_id, status="failed", error="interrupted by shutdown", finished_at=datetime.now(timezone.utc))
+        raise
+    except Exception as e:
+        logger.error(f"Employee import job {job_id} failed: {e!r}")
+        await _update_job(job_id, status="failed", error=repr(e), finished_at=datetime.now(timezone.utc))
+    finally:
+        os.unlink(path)
+
+async def start_import_job(db: AsyncSession, upload: UploadFile, user_id: int) -> ImportJob:
+    """Record a queued job for the upload and run it in the background"""
+    path = await run_in_threadpool(_spool, upload.file)
+    job = ImportJob(filename=upload.filename, created_by=user_id, status="queued")
+    db.add(job)
+    try:
+        await db.commit()
+    except Exception:
+        os.unlink(path)
+        raise
+    await db.refresh(job)
+    fmt = detect_format(upload.filename, upload.content_type)
+    # A fresh context, so the job's queries don't count against this request's SQL profile
+    task = contextvars.Context().run(asyncio.get_running_loop().create_task, run_import_job(job.id, path, fmt))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    return job
+
+async def stop_import_jobs():
+    """Cancel this worker's jobs on shutdown; they are marked failed"""
+    for task in list(_job_tasks):
+        task.cancel()
+    await asyncio.gather(*_job_tasks, return_exceptions=True)
+
+def job_payload(job: ImportJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "report": json.loads(job.report) if job.report else None,
+    }
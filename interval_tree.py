@@ -0,0 +1,134 @@
+import random
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+class _Node:
+    __slots__ = ("start", "end", "key", "value", "priority", "max_end", "left", "right")
+
+    def __init__(self, start, end, key, value):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.priority = random.random()
+        self.max_end = end
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+def _update(node: _Node):
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+def _split(node: Optional[_Node], order) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split into (nodes ordered before ``order``, the rest)"""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < order:
+        node.right, right = _split(node.right, order)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, order)
+    _update(node)
+    return left, node
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+class IntervalTree:
+    """Closed intervals [start, end] with overlap queries in O(log n + k).
+
+    A treap ordered by (start, key) where every node also carries the
+    largest ``end`` in its subtree, so whole subtrees that end before the
+    query window are skipped. Keys are unique; inserting an existing key
+    replaces its interval. Thread-safe.
+    """
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._starts: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._starts
+
+    def _remove_locked(self, key: Hashable):
+        start = self._starts.pop(key, None)
+        if start is None:
+            return
+        left, rest = _split(self._root, (start, key))
+        _, right = _split(rest, (start, key, None))  # a 3-tuple sorts just after (start, key)
+        self._root = _merge(left, right)
+
+    def insert(self, start, end, key: Hashable, value: Any = None):
+        if end < start:
+            raise ValueError("interval end is before its start")
+        node = _Node(start, end, key, value)
+        with self._lock:
+            self._remove_locked(key)
+            left, right = _split(self._root, (start, key))
+            self._root = _merge(_merge(left, node), right)
+            self._starts[key] = start
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            self._remove_locked(key)
+
+    def load(self, intervals: Iterable[Tuple[Any, Any, Hashable, Any]]):
+        """Replace the contents with ``(start, end, key, value)`` tuples, built in O(n log n)"""
+        nodes = sorted(
+            (_Node(start, end, key, value) for start, end, key, value in intervals),
+            key=lambda node: (node.start, node.key),
+        )
+        # Build the treap from sorted nodes with the Cartesian-tree stack method
+        stack: List[_Node] = []
+        for node in nodes:
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+                _update(last)
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = stack[0] if stack else None
+        while stack:
+            _update(stack.pop())
+        with self._lock:
+            self._root = root
+            self._starts = {node.key: node.start for node in nodes}
+
+    def overlapping(self, start, end) -> List[Tuple[Any, Any, Hashable, Any]]:
+        """Return ``(start, end, key, value)`` for every interval intersecting [start, end]"""
+        found = []
+        with self._lock:
+            stack = [self._root] if self._root is not None else []
+            while stack:
+                node = stack.pop()
+                if node.max_end < start:
+                    continue
+                if node.left is not None:
+                    stack.append(node.left)
+                if node.start <= end:
+                    if node.end >= start:
+                        found.append((node.start, node.end, node.key, node.value))
+                    if node.right is not None:
+                        stack.append(node.right)
+        found.sort(key=lambda item: (item[0], item[2]))
+        return found
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Leave balance ledger.
+
+leave_balances holds approved (used) and pending leave days per employee,
+leave type and year. Requests, approvals and rejections adjust it in the
+same transaction as the leave row, so a balance read is one indexed fetch
+instead of a sum over every leave. Run ``python leave_balances.py --verify``
+to reconcile it against the raw leave rows and ``--rebuild`` to rewrite it.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+from config import settings
+from crud import dialect_insert
+from database import AsyncSessionLocal
+from models import Leave, LeaveBalance
+from payroll import UNPAID_LEAVE_TYPES
+
+logger = logging.getLogger(__name__)
+
+BalanceKey = Tuple[int, str, int]  # (employee_id, leave_type, year)
+
+ENTITLEMENTS: Dict[str, int] = {
+    leave_type.strip().lower(): int(days)
+    for leave_type, _, days in (
+        pair.partition(":") for pair in settings.LEAVE_ENTITLEMENTS.split(",") if pair.strip()
+    )
+}
+# Types a request may use: entitled ones plus the unpaid ones payroll deducts
+LEAVE_TYPES = frozenset(ENTITLEMENTS) | frozenset(UNPAID_LEAVE_TYPES)
+UPSERT_BATCH_SIZE = 1000
+
+def weekdays_between(start: date, end: date) -> int:
+    """Count Monday-Friday days in [start, end]"""
+    if end < start:
+        return 0
+    total = (end - start).days + 1
+    full_weeks, remainder = divmod(total, 7)
+    days = full_weeks * 5
+    for offset in range(remainder):
+        if (start.weekday() + offset) % 7 < 5:
+            days += 1
+    return days
+
+def split_by_year(start: date, end: date) -> Dict[int, int]:
+    """Weekdays of [start, end] per calendar year, so year-spanning leaves count against both years"""
+    return {
+        year: weekdays_between(max(start, date(year, 1, 1)), min(end, date(year, 12, 31)))
+        for year in range(start.year, end.year + 1)
+    }
+
+async def apply_ledger(
+    db, employee_id: int, leave_type: str, start: date, end: date,
+    used: int = 0, pending: int = 0, limit: Optional[int] = None,
+) -> bool:
+    """Add ``used``/``pending`` times the leave's days to its ledger rows; the caller commits.
+
+    Increments happen in the upsert itself, so concurrent decisions for the
+    same employee never overwrite each other. With ``limit`` a row is only
+    changed while used + pending stays within it, checked against the row
+    as locked by the upsert; returns False (and the caller should roll back)
+    if any year's row would have gone over.
+    """
+    rows = [
+        {
+            "employee_id": employee_id,
+            "leave_type": leave_type,
+            "year": year,
+            "used_days": used * days,
+            "pending_days": pending * days,
+        }
+        for year, days in split_by_year(start, end).items()
+        if days
+    ]
+    if not rows:
+        return True
+    if limit is not None and any(row["used_days"] + row["pending_days"] > limit for row in rows):
+        return False
+    dialect = (await db.connection()).dialect.name
+    stmt = dialect_insert(dialect, LeaveBalance).values(rows)
+    excluded = stmt.excluded
+    within_limit = None
+    if limit is not None:
+        within_limit = (
+            LeaveBalance.used_days + LeaveBalance.pending_days + excluded.used_days + excluded.pending_days <= limit
+        )
+    result = await db.execute(stmt.on_conflict_do_update(
+        index_elements=[LeaveBalance.employee_id, LeaveBalance.leave_type, LeaveBalance.year],
+        set_={
+            "used_days": LeaveBalance.used_days + excluded.used_days,
+            "pending_days": LeaveBalance.pending_days + excluded.pending_days,
+            "updated_at": func.now(),
+        },
+        where=within_limit,
+    ))
+    return result.rowcount == len(rows)
+
+def _balance(leave_type: str, year: int, used: int, pending: int) -> dict:
+    entitled = ENTITLEMENTS.get(leave_type)
+    return {
+        "leave_type": leave_type,
+        "year": year,
+        "entitled_days": entitled,
+        "used_days": used,
+        "pending_days": pending,
+        "remaining_days": None if entitled is None else entitled - used - pending,
+    }
+
+async def get_balances(db, employee_id: int, year: int, leave_type: Optional[str] = None) -> List[dict]:
+    """Balances for every entitled type plus any other type with ledger entries"""
+    query = select(LeaveBalance.leave_type, LeaveBalance.used_days, LeaveBalance.pending_days).where(
+        LeaveBalance.employee_id == employee_id, LeaveBalance.year == year
+    )
+    if leave_type is not None:
+        query = query.where(LeaveBalance.leave_type == leave_type)
+    stored = {row.leave_type: (row.used_days, row.pending_days) for row in await db.execute(query)}
+    types = [leave_type] if leave_type is not None else sorted(set(ENTITLEMENTS) | set(stored))
+    return [_balance(name, year, *stored.get(name, (0, 0))) for name in types]
+
+async def _expected(db, year: Optional[int]) -> Dict[BalanceKey, List[int]]:
+    """Recompute ledger values from the raw pending/approved leave rows"""
+    query = select(Leave.employee_id, Leave.leave_type, Leave.start_date, Leave.end_date, Leave.status).where(
+        Leave.status.in_(("pending", "approved"))
+    )
+    if year is not None:
+        query = query.where(Leave.start_date <= date(year, 12, 31), Leave.end_date >= date(year, 1, 1))
+    expected: Dict[BalanceKey, List[int]] = {}
+    rows = await db.stream(query.execution_options(yield_per=10000))
+    async for employee_id, leave_type, start, end, status in rows:
+        for leave_year, days in split_by_year(start, end).items():
+            if not days or (year is not None and leave_year != year):
+                continue
+            totals = expected.setdefault((employee_id, leave_type, leave_year), [0, 0])
+            totals[0 if status == "approved" else 1] += days
+    return expected
+
+async def verify_balances(year: Optional[int] = None) -> List[dict]:
+    """Return ledger rows that disagree with the raw leave rows"""
+    async with AsyncSessionLocal() as db:
+        expected = await _expected(db, year)
+        query = select(
+            LeaveBalance.employee_id, LeaveBalance.leave_type, LeaveBalance.year,
+            LeaveBalance.used_days, LeaveBalance.pending_days,
+        )
+        if year is not None:
+            query = query.where(LeaveBalance.year == year)
+        stored = {
+            (employee_id, leave_type, row_year): [used, pending]
+            for employee_id, leave_type, row_year, used, pending in await db.execute(query)
+        }
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        want, have = expected.get(key, [0, 0]), stored.get(key, [0, 0])
+        if want != have:
+            employee_id, leave_type, row_year = key
+            mismatches.append({
+                "employee_id": employee_id,
+                "leave_type": leave_type,
+                "year": row_year,
+                "expected": {"used_days": want[0], "pending_days": want[1]},
+                "stored": {"used_days": have[0], "pending_days": have[1]},
+            })
+    return mismatches
+
+async def rebuild_balances(year: Optional[int] = None) -> int:
+    """Rewrite the ledger (optionally one year) from the raw leave rows"""
+    async with AsyncSessionLocal() as db:
+        expected = await _expected(db, year)
+        conditions = [LeaveBalance.year == year] if year is not None else []
+        await db.execute(delete(LeaveBalance).where(*conditions))
+        rows = [
+            {
+                "employee_id": employee_id,
+                "leave_type": leave_type,
+                "year": row_year,
+                "used_days": used,
+                "pending_days": pending,
+            }
+            for (employee_id, leave_type, row_year), (used, pending) in expected.items()
+        ]
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            await db.execute(insert(LeaveBalance), rows[start:start + UPSERT_BATCH_SIZE])
+        await db.commit()
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify or rebuild the leave balance ledger")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--verify", action="store_true", help="report ledger rows that disagree with raw leaves")
+    group.add_argument("--rebuild", action="store_true", help="rewrite the ledger from raw leaves")
+    parser.add_argument("--year", type=int)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.rebuild:
+        written = asyncio.run(rebuild_balances(args.year))
+        logger.info(f"Rebuilt {written} leave balance rows")
+        return
+    mismatches = asyncio.run(verify_balances(args.year))
+    for mismatch in mismatches:
+        logger.warning(f"Leave balance mismatch: {mismatch}")
+    logger.info(f"{len(mismatches)} leave balance mismatches")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import DDL, event, func, literal_column, select, update
+
+from config import settings
+from database import AsyncSessionLocal, on_commit
+from interval_tree import IntervalTree
+from leave_balances import ENTITLEMENTS, LEAVE_TYPES, apply_ledger, get_balances, split_by_year, weekdays_between
+from models import Employee, Leave
+
+logger = logging.getLogger(__name__)
+
+# Leaves that block the calendar; rejected requests are ignored
+ACTIVE_STATUSES = ("pending", "approved")
+
+# daterange(start_date, end_date, '[]'), spelled exactly as in the GiST index so
+# PostgreSQL can match the expression (a bound '[]' parameter would not match)
+LEAVE_RANGE = func.daterange(Leave.start_date, Leave.end_date, literal_column("'[]'"))
+
+event.listen(
+    Leave.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS idx_leaves_daterange ON leaves "
+        "USING gist (daterange(start_date, end_date, '[]'))"
+    ).execute_if(dialect="postgresql"),
+)
+
+LEAVE_COLUMNS = (
+    Leave.id,
+    Leave.employee_id,
+    Leave.leave_type,
+    Leave.start_date,
+    Leave.end_date,
+    Leave.status,
+)
+
+class LeaveConflictError(ValueError):
+    """Raised when a leave request overlaps one of the employee's active leaves"""
+
+    def __init__(self, leave_ids: List[int]):
+        super().__init__(f"Overlaps existing leave(s): {', '.join(str(leave_id) for leave_id in leave_ids)}")
+        self.leave_ids = leave_ids
+
+class InsufficientLeaveBalanceError(ValueError):
+    """Raised when a request exceeds the remaining entitlement for its type"""
+
+class LeaveStateError(ValueError):
+    """Raised when deciding a leave that is no longer pending"""
+
+class UnknownLeaveTypeError(ValueError):
+    """Raised when a request names a leave type that is neither entitled nor unpaid"""
+
+def normalize_leave_type(leave_type: str) -> str:
+    """Canonical (stripped, lower-case) leave type; unknown types are refused"""
+    normalized = leave_type.strip().lower()
+    if normalized not in LEAVE_TYPES:
+        raise UnknownLeaveTypeError(
+            f"Unknown leave type {leave_type!r}; expected one of {', '.join(sorted(LEAVE_TYPES))}"
+        )
+    return normalized
+
+class LeaveIndex(IntervalTree):
+    """Active leaves by date range, for deployments without the GiST index"""
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+
+    def load(self, intervals):
+        super().load(intervals)
+        self.loaded = True
+
+leave_index = LeaveIndex()
+
+def _entry(row) -> dict:
+    return {
+        "id": row.id,
+        "employee_id": row.employee_id,
+        "leave_type": row.leave_type,
+        "start_date": row.start_date,
+        "end_date": row.end_date,
+        "status": row.status,
+    }
+
+def _apply_commit(upserts: List[dict], deleted: List[int]):
+    if not leave_index.loaded:
+        return
+    for entry in upserts:
+        if entry["status"] in ACTIVE_STATUSES:
+            leave_index.insert(entry["start_date"], entry["end_date"], entry["id"], entry)
+        else:
+            leave_index.remove(entry["id"])
+    for leave_id in deleted:
+        leave_index.remove(leave_id)
+
+# Result rows and Leave objects expose the same attributes, so _entry doubles as the snapshot
+on_commit(Leave, _entry, _apply_commit)
+
+def uses_database_calendar(dialect_name: str) -> bool:
+    if settings.LEAVE_CALENDAR_BACKEND == "auto":
+        return dialect_name == "postgresql"
+    return settings.LEAVE_CALENDAR_BACKEND == "database"
+
+async def refresh_leave_index():
+    """(Re)load every active leave into the in-memory interval tree"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(*LEAVE_COLUMNS).where(Leave.status.in_(ACTIVE_STATUSES)))
+        entries = [_entry(row) for row in result]
+    leave_index.load((entry["start_date"], entry["end_date"], entry["id"], entry) for entry in entries)
+
+async def run_leave_index_refresher():
+    """Background task: keep the interval tree loaded and pick up other workers' writes"""
+    while True:
+        try:
+            await refresh_leave_index()
+        except Exception as e:
+            logger.error(f"Leave index refresh failed: {e}")
+        await asyncio.sleep(settings.LEAVE_CALENDAR_REFRESH_SECONDS)
+
+EMPLOYEE_COLUMNS = (Employee.first_name, Employee.last_name, Employee.department)
+
+def _calendar_entry(row) -> dict:
+    return {
+        **_entry(row),
+        "first_name": row.first_name,
+        "last_name": row.last_name,
+        "department": row.department,
+    }
+
+async def find_overlapping_leaves(
+    db,
+    start: date,
+    end: date,
+    department: Optional[str] = None,
+    statuses: Iterable[str] = ACTIVE_STATUSES,
+) -> List[dict]:
+    """Leaves intersecting [start, end] with the employee's name, optionally for one department"""
+    statuses = tuple(statuses)
+    if uses_database_calendar(db.bind.dialect.name):
+        query = (
+            select(*LEAVE_COLUMNS, *EMPLOYEE_COLUMNS)
+            .join(Employee, Employee.id == Leave.employee_id)
+            .where(
+                LEAVE_RANGE.op("&&")(func.daterange(start, end, literal_column("'[]'"))),
+                Leave.status.in_(statuses),
+            )
+            .order_by(Leave.start_date, Leave.id)
+        )
+        if department is not None:
+            query = query.where(Employee.department == department)
+        return [_calendar_entry(row) for row in await db.execute(query)]
+
+    if not leave_index.loaded:
+        await refresh_leave_index()
+    leaves = [
+        entry for _, _, _, entry in leave_index.overlapping(start, end) if entry["status"] in statuses
+    ]
+    if not leaves:
+        return []
+    # Names come from one query bounded by the department (or by the overlapping
+    # leaves as a subquery), never from an IN list of every id the tree returned
+    query = select(Employee.id, *EMPLOYEE_COLUMNS)
+    if department is not None:
+        query = query.where(Employee.department == department)
+    else:
+        query = query.where(
+            Employee.id.in_(
+                select(Leave.employee_id).where(
+                    Leave.start_date <= end, Leave.end_date >= start, Leave.status.in_(statuses)
+                )
+            )
+        )
+    employees = {row.id: row._asdict() for row in await db.execute(query)}
+    return [
+        {
+            **leave,
+            "first_name": employees[leave["employee_id"]]["first_name"],
+            "last_name": employees[leave["employee_id"]]["last_name"],
+            "department": employees[leave["employee_id"]]["department"],
+        }
+        for leave in leaves
+        if leave["employee_id"] in employees
+    ]
+
+async def leave_calendar(
+    db, start: date, end: date, department: Optional[str] = None, include_pending: bool = False
+) -> List[dict]:
+    """Who is out between start and end, with employee names"""
+    statuses = ACTIVE_STATUSES if include_pending else ("approved",)
+    return await find_overlapping_leaves(db, start, end, department, statuses)
+
+async def team_availability(db, start: date, end: date, department: Optional[str] = None) -> List[dict]:
+    """Per-day headcount and number of people on approved leave"""
+    headcount_query = select(func.count(Employee.id))
+    if department is not None:
+        headcount_query = headcount_query.where(Employee.department == department)
+    headcount = (await db.execute(headcount_query)).scalar()
+
+    leaves = await find_overlapping_leaves(db, start, end, department, ("approved",))
+    days = (end - start).days + 1
+    out = [set() for _ in range(days)]
+    for leave in leaves:
+        first = max(leave["start_date"], start)
+        last = min(leave["end_date"], end)
+        for offset in range((first - start).days, (last - start).days + 1):
+            out[offset].add(leave["employee_id"])
+    return [
+        {
+            "date": start + timedelta(days=offset),
+            "headcount": headcount,
+            "out": len(out[offset]),
+            "available": headcount - len(out[offset]),
+        }
+        for offset in range(days)
+    ]
+
+async def _lock_employee_leaves(db, employee_id: int):
+    """Lock the employee row so their leave requests are checked and inserted one at a time"""
+    await db.execute(select(Employee.id).where(Employee.id == employee_id).with_for_update())
+
+async def _employee_conflicts(db, leave: Leave) -> List[int]:
+    """Ids of the employee's other active leaves intersecting ``leave``, read from the database.
+
+    The interval tree can lag other workers' writes, so the write path never
+    trusts it; one employee's leaves are few and indexed by idx_leaves_employee.
+    """
+    result = await db.execute(
+        select(Leave.id).where(
+            Leave.employee_id == leave.employee_id,
+            Leave.id != leave.id,
+            Leave.status.in_(ACTIVE_STATUSES),
+            Leave.start_date <= leave.end_date,
+            Leave.end_date >= leave.start_date,
+        ).order_by(Leave.start_date, Leave.id)
+    )
+    return list(result.scalars())
+
+async def create_leave(db, employee_id: int, leave_type: str, start: date, end: date, reason: Optional[str] = None):
+    """Record a pending leave request and reserve its days in the balance ledger.
+
+    Unknown leave types, requests overlapping one of the employee's active
+    leaves, and requests exceeding the remaining entitlement are refused; the ledger upsert
+    itself enforces the entitlement. Concurrent requests can't both pass the
+    overlap check: PostgreSQL serializes them on the employee row lock, and
+    on SQLite (where FOR UPDATE is a no-op) the row is inserted before
+    checking, so the check runs under the write lock.
+    """
+    leave_type = normalize_leave_type(leave_type)
+    await _lock_employee_leaves(db, employee_id)
+    leave = Leave(
+        employee_id=employee_id,
+        leave_type=leave_type,
+        start_date=start,
+        end_date=end,
+        days_requested=weekdays_between(start, end),
+        reason=reason,
+        status="pending",
+    )
+    db.add(leave)
+    await db.flush()
+    conflicts = await _employee_conflicts(db, leave)
+    if conflicts:
+        await db.rollback()
+        raise LeaveConflictError(conflicts)
+    entitled = ENTITLEMENTS.get(leave_type)
+    if not await apply_ledger(db, employee_id, leave_type, start, end, pending=1, limit=entitled):
+        for year, days in split_by_year(start, end).items():
+            balance = (await get_balances(db, employee_id, year, leave_type))[0]
+            if days > balance["remaining_days"]:
+                break
+        await db.rollback()
+        raise InsufficientLeaveBalanceError(
+            f"Only {balance['remaining_days']} {leave_type} day(s) left for {year}, {days} requested"
+        )
+    await db.commit()
+    await db.refresh(leave)
+    return leave
+
+async def decide_leave(db, leave_id: int, approve: bool, approver_id: int):
+    """Approve or reject a pending leave, moving its days in the ledger in the same transaction.
+
+    The status flips with a conditional UPDATE (WHERE status = 'pending'), so
+    of two concurrent decisions only one gets a row back and touches the
+    ledger, on SQLite (where FOR UPDATE is a no-op) as well as PostgreSQL.
+    """
+    claimed = await db.execute(
+        update(Leave)
+        .where(Leave.id == leave_id, Leave.status == "pending")
+        .values(status="approved" if approve else "rejected")
+        .execution_options(synchronize_session=False)
+    )
+    leave = (await db.execute(
+        select(Leave).where(Leave.id == leave_id).execution_options(populate_existing=True)
+    )).scalar()
+    if leave is None:
+        return None
+    if claimed.rowcount == 0:
+        current_status = leave.status
+        await db.rollback()
+        raise LeaveStateError(f"Leave is already {current_status}")
+    # Set through the ORM so the commit hook sees the decision (interval tree)
+    leave.approved_by = approver_id
+    leave.approved_at = datetime.now(timezone.utc)
+    await db.flush()
+    await apply_ledger(
+        db, leave.employee_id, leave.leave_type, leave.start_date, leave.end_date,
+        used=1 if approve else 0, pending=-1,
+    )
+    await db.commit()
+    return leave
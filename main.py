@@ -1,30 +1,60 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import JSONResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from datetime import timedelta
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+import asyncio
 import os
 import logging
 
-from database import engine, get_db, init_db
-from models import Base, User, Employee
-from schemas import UserCreate, UserLogin, UserResponse, Token, EmployeeCreate, EmployeeResponse
-from crud import authenticate_user, create_user, create_employee, get_employee_by_user_id
-from auth import create_access_token, verify_token
+from database import (
+    AsyncSessionLocal, SchemaVersionError, dialect_name, get_db, init_db, on_engine_created, pool_wait,
+    replica_pool_wait, verify_schema_revision,
+)
+from models import Base, User, Employee, AttendanceMonthlySummary, ImportJob
+from schemas import (
+    UserCreate, UserLogin, UserResponse, Token, EmployeeCreate, EmployeeResponse, ImportJobResponse,
+    AttendanceAck, BadgeEventBatch, BadgeEventAck, PayrollRunRequest, PayrollRunReport,
+    AttendanceCorrection, AttendanceResponse, AttendanceSummary, AttendanceReportRow,
+    EmployeeDirectoryPage, EmployeeSearchResult,
+    LeaveCreate, LeaveResponse, LeaveCalendarEntry, TeamAvailabilityDay, LeaveBalanceResponse,
+)
+from crud import (
+    authenticate_user, create_user, create_employee, get_employee_by_user_id, get_employee_profile,
+    get_employee_version, get_user_principal, user_cache, sync_login_filter,
+)
+from serialization import (
+    FastJSONResponse, employee_payload, etag_matches, not_modified, profile_etag, profile_response, user_payload,
+)
+from auth import (
+    create_access_token, verify_token, HashingUnavailableError, UserPrincipal, shutdown_hash_executor, token_cache,
+)
 from config import settings
+from importer import job_payload, start_import_job, stop_import_jobs
+from attendance import AttendanceEvent, attendance_batcher, correct_attendance
+from payroll import run_payroll
+from directory import InvalidCursorError, build_directory_query, decode_cursor, fetch_directory_page
+from search import run_name_index_refresher, search_employees, uses_database_search
+from leaves import (
+    InsufficientLeaveBalanceError, LeaveConflictError, LeaveStateError, UnknownLeaveTypeError, create_leave,
+    decide_leave, leave_calendar, run_leave_index_refresher, team_availability, uses_database_calendar,
+)
+from leave_balances import get_balances
+from health import health_monitor, replica_monitor
+from replica import ReadYourWritesMiddleware, get_read_db, read_sessionmaker
+from ratelimit import AdmissionRejectedError, RateLimitedError, auth_admission, retry_after_header
+from sql_profiler import SQLProfilerMiddleware, instrument_engine, query_budget
+from metrics import (
+    CONTENT_TYPE_LATEST, DB_POOL_CHECKOUT_WAIT, MetricsMiddleware, mark_worker_dead, render_metrics,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-try:
-    init_db()
-    logger.info("Database initialized successfully")
-except Exception as e:
-    logger.error(f"Database initialization failed: {e}")
-
 app = FastAPI(title="HRMS API", version="1.0.0")
 
 # CORS middleware
@@ -36,10 +66,135 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Read-your-writes stickiness for read-replica routing (no-op without a replica)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-request SQL profiling (slow-query log, N+1 detection, query budgets, per-request SQL metrics)
+app.add_middleware(SQLProfilerMiddleware)
+
+# Prometheus metrics (added last so it wraps CORS and sees every response)
+app.add_middleware(MetricsMiddleware)
+pool_wait.observers.append(DB_POOL_CHECKOUT_WAIT.labels("primary").observe)
+replica_pool_wait.observers.append(DB_POOL_CHECKOUT_WAIT.labels("replica").observe)
+
+@on_engine_created
+def instrument_new_engine(name, sync_engine):
+    # Engines are created lazily, on first use
+    instrument_engine(sync_engine, name)
+
 # Security
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+@app.exception_handler(HashingUnavailableError)
+async def hashing_unavailable_handler(request: Request, exc: HashingUnavailableError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(RateLimitedError)
+async def rate_limited_handler(request: Request, exc: RateLimitedError):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": retry_after_header(exc.retry_after)},
+    )
+
+@app.exception_handler(AdmissionRejectedError)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejectedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+@app.on_event("startup")
+async def prepare_database():
+    # Registered first, so the schema is settled before other startup work
+    if settings.DB_STARTUP_MODE == "create_all":
+        try:
+            init_db()
+            logger.info("Database initialized successfully")
+        except SchemaVersionError:
+            raise  # serving on an outdated schema fails later, per request
+        except Exception as e:
+            logger.error(f"Database initialization failed: {e}")
+    elif settings.DB_STARTUP_MODE == "verify":
+        await verify_schema_revision()
+        logger.info("Database schema revision verified")
+
+@app.on_event("startup")
+async def load_login_filter():
+    if not settings.LOGIN_FILTER_ENABLED:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await sync_login_filter(db)
+        logger.info("Login identifier filter loaded")
+    except Exception as e:
+        # The filter stays permissive until a later sync succeeds
+        logger.error(f"Login identifier filter load failed: {e}")
+
+@app.on_event("startup")
+async def start_attendance_batcher():
+    attendance_batcher.start()
+
+name_index_task = None
+
+@app.on_event("startup")
+async def start_name_index():
+    global name_index_task
+    if not uses_database_search(dialect_name()):
+        name_index_task = asyncio.get_running_loop().create_task(run_name_index_refresher())
+
+@app.on_event("shutdown")
+async def stop_name_index():
+    if name_index_task is not None:
+        name_index_task.cancel()
+
+leave_index_task = None
+
+@app.on_event("startup")
+async def start_leave_index():
+    global leave_index_task
+    if not uses_database_calendar(dialect_name()):
+        leave_index_task = asyncio.get_running_loop().create_task(run_leave_index_refresher())
+
+@app.on_event("shutdown")
+async def stop_leave_index():
+    if leave_index_task is not None:
+        leave_index_task.cancel()
+
+@app.on_event("startup")
+async def start_health_monitor():
+    await health_monitor.start()
+    if replica_monitor is not None:
+        await replica_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_health_monitor():
+    await health_monitor.stop()
+    if replica_monitor is not None:
+        await replica_monitor.stop()
+
+@app.on_event("shutdown")
+async def stop_attendance_batcher():
+    await attendance_batcher.stop()
+
+@app.on_event("shutdown")
+async def stop_employee_imports():
+    await stop_import_jobs()
+
+@app.on_event("shutdown")
+def shutdown_hashing():
+    shutdown_hash_executor()
+
+@app.on_event("shutdown")
+def shutdown_metrics():
+    mark_worker_dead()
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
     token = credentials.credentials
     payload = verify_token(token)
     if payload is None:
@@ -48,14 +203,14 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user_id: int = payload.get("sub")
+    user_id = payload.get("sub")
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_principal(db, str(user_id))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,9 +219,23 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         )
     return user
 
+def require_roles(*roles: str):
+    """Dependency factory restricting a route to the given user roles"""
+    async def dependency(current_user: UserPrincipal = Depends(get_current_user)):
+        if current_user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return current_user
+    return dependency
+
 @app.post("/api/auth/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_credentials.email_or_employee_id, user_credentials.password)
+@query_budget(4)  # 3, plus the UPDATE when an outdated password hash is replaced
+async def login(request: Request, user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    identifier = user_credentials.email_or_employee_id
+    async with auth_admission.admit("login", request.client.host if request.client else None, identifier):
+        user = await authenticate_user(db, identifier, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,89 +243,431 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    auth_admission.record_success(identifier)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
     
-    return {
+    return FastJSONResponse({
         "access_token": access_token,
         "token_type": "bearer",
-        "user": user
-    }
+        "user": user_payload(user)
+    })
 
 @app.post("/api/auth/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists
-    db_user = db.query(User).filter(
-        (User.email == user.email) | (User.employee_id == user.employee_id)
-    ).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email or Employee ID already registered"
+async def register(request: Request, user: UserCreate, db: AsyncSession = Depends(get_db)):
+    async with auth_admission.admit("register", request.client.host if request.client else None):
+        # Check if user already exists
+        result = await db.execute(
+            select(User).where(
+                (User.email == user.email) | (User.employee_id == user.employee_id)
+            )
         )
-    
-    return create_user(db=db, user=user)
+        db_user = result.scalars().first()
+        if db_user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email or Employee ID already registered"
+            )
+        
+        return await create_user(db=db, user=user)
 
 @app.get("/api/users/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
+@query_budget(1)
+async def read_users_me(request: Request, current_user: UserPrincipal = Depends(get_current_user)):
+    # The principal comes from the user cache, so the ETag costs no query at all
+    etag = profile_etag("user", current_user.id, current_user.created_at, current_user.updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return profile_response(user_payload(current_user), etag)
+
+@app.get("/api/employees", response_model=EmployeeDirectoryPage)
+@query_budget(2)
+async def list_employees(
+    request: Request,
+    department: Optional[str] = None,
+    position: Optional[str] = None,
+    hired_from: Optional[date] = None,
+    hired_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: UserPrincipal = Depends(require_roles("hr", "manager"))
+):
+    """Employee directory with keyset pagination; pass next_cursor back to get the next page"""
+    try:
+        after_id = decode_cursor(cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    query = build_directory_query(after_id, limit, department, position, hired_from, hired_to)
+    return FastJSONResponse(await fetch_directory_page(query, limit, read_sessionmaker(request)))
+
+@app.get("/api/employees/search", response_model=List[EmployeeSearchResult])
+@query_budget(3)
+async def search_employee_names(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Ranked typeahead over employee names (prefix first, then fuzzy)"""
+    return FastJSONResponse(await search_employees(db, q, limit))
 
 @app.get("/api/employees/me", response_model=EmployeeResponse)
-def read_employee_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    employee = get_employee_by_user_id(db, current_user.id)
+@query_budget(3)
+async def read_employee_me(
+    request: Request,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    if request.headers.get("if-none-match"):
+        # Revalidation: compare against the version columns before loading the row
+        version = await get_employee_version(db, current_user.id)
+        if version is not None:
+            etag = profile_etag("employee", version.id, version.created_at, version.updated_at)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+    employee = await get_employee_profile(db, current_user.id)
     if not employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Employee profile not found"
         )
-    return employee
+    etag = profile_etag("employee", employee.id, employee.created_at, employee.updated_at)
+    return profile_response(employee_payload(employee), etag)
 
 @app.post("/api/employees", response_model=EmployeeResponse)
-def create_employee_profile(
+async def create_employee_profile(
     employee: EmployeeCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if employee profile already exists
-    existing_employee = get_employee_by_user_id(db, current_user.id)
+    existing_employee = await get_employee_by_user_id(db, current_user.id)
     if existing_employee:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Employee profile already exists"
         )
     
-    return create_employee(db=db, employee=employee, user_id=current_user.id)
+    return await create_employee(db=db, employee=employee, user_id=current_user.id)
+
+@app.post("/api/employees/import", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def import_employee_profiles(
+    file: UploadFile = File(...),
+    current_user: UserPrincipal = Depends(require_roles("hr")),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk onboarding from a CSV or NDJSON upload, run in the background; poll the job for its report"""
+    job = await start_import_job(db, file, current_user.id)
+    return job_payload(job)
+
+@app.get("/api/employees/import/{job_id}", response_model=ImportJobResponse)
+async def read_import_job(
+    job_id: str,
+    current_user: UserPrincipal = Depends(require_roles("hr")),
+    db: AsyncSession = Depends(get_db)
+):
+    """Status of an import job, with its per-row error report once completed"""
+    job = await db.get(ImportJob, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return job_payload(job)
+
+async def _punch(kind: str, current_user: UserPrincipal, db: AsyncSession):
+    result = await db.execute(select(Employee.id).where(Employee.user_id == current_user.id))
+    employee_id = result.scalar()
+    if employee_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Employee profile not found"
+        )
+    # Release the pooled connection before waiting on the group commit
+    await db.close()
+    event = AttendanceEvent(employee_id, kind, datetime.now(timezone.utc))
+    await attendance_batcher.submit([event])
+    return {"employee_id": employee_id, "date": event.local_date, "kind": kind, "timestamp": event.utc_timestamp}
+
+@app.post("/api/attendance/check-in", response_model=AttendanceAck)
+async def check_in(
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await _punch("in", current_user, db)
+
+@app.post("/api/attendance/check-out", response_model=AttendanceAck)
+async def check_out(
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await _punch("out", current_user, db)
+
+@app.post("/api/attendance/badge-events", response_model=BadgeEventAck)
+async def ingest_badge_events(
+    batch: BadgeEventBatch,
+    current_user: UserPrincipal = Depends(require_roles("hr")),
+    db: AsyncSession = Depends(get_db)
+):
+    """Badge-reader feed; acknowledged once the events are committed"""
+    employee_ids = {event.employee_id for event in batch.events}
+    result = await db.execute(select(Employee.id).where(Employee.id.in_(employee_ids)))
+    unknown = employee_ids - set(result.scalars())
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown employee IDs: {sorted(unknown)}"
+        )
+    await db.close()
+    await attendance_batcher.submit([
+        AttendanceEvent(event.employee_id, event.kind, event.timestamp) for event in batch.events
+    ])
+    return {"accepted": len(batch.events)}
+
+@app.patch("/api/attendance/{attendance_id}", response_model=AttendanceResponse)
+async def correct_attendance_record(
+    attendance_id: int,
+    correction: AttendanceCorrection,
+    current_user: UserPrincipal = Depends(require_roles("hr")),
+    db: AsyncSession = Depends(get_db)
+):
+    record = await correct_attendance(db, attendance_id, correction.dict(exclude_unset=True))
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attendance record not found"
+        )
+    return record
+
+SUMMARY_COLUMNS = (
+    AttendanceMonthlySummary.employee_id,
+    AttendanceMonthlySummary.year,
+    AttendanceMonthlySummary.month,
+    AttendanceMonthlySummary.present_days,
+    AttendanceMonthlySummary.late_days,
+    AttendanceMonthlySummary.half_days,
+    AttendanceMonthlySummary.absent_days,
+    AttendanceMonthlySummary.total_hours,
+)
+
+@app.get("/api/attendance/summary", response_model=AttendanceSummary)
+@query_budget(3)
+async def read_attendance_summary(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Current employee's monthly summary, served from the rollup table"""
+    employee_id = (await db.execute(select(Employee.id).where(Employee.user_id == current_user.id))).scalar()
+    if employee_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Employee profile not found"
+        )
+    row = (await db.execute(
+        select(*SUMMARY_COLUMNS).where(
+            AttendanceMonthlySummary.employee_id == employee_id,
+            AttendanceMonthlySummary.year == year,
+            AttendanceMonthlySummary.month == month,
+        )
+    )).first()
+    if row is None:
+        return {
+            "employee_id": employee_id, "year": year, "month": month,
+            "present_days": 0, "late_days": 0, "half_days": 0, "absent_days": 0, "total_hours": 0,
+        }
+    return row._asdict()
+
+@app.get("/api/reports/attendance", response_model=List[AttendanceReportRow])
+@query_budget(2)
+async def attendance_report(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    department: Optional[str] = None,
+    current_user: UserPrincipal = Depends(require_roles("hr", "manager")),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Monthly attendance per employee, served from the rollup table"""
+    query = (
+        select(*SUMMARY_COLUMNS, Employee.first_name, Employee.last_name, Employee.department)
+        .join(Employee, Employee.id == AttendanceMonthlySummary.employee_id)
+        .where(AttendanceMonthlySummary.year == year, AttendanceMonthlySummary.month == month)
+        .order_by(AttendanceMonthlySummary.employee_id)
+    )
+    if department is not None:
+        query = query.where(Employee.department == department)
+    return FastJSONResponse([row._asdict() for row in await db.execute(query)])
+
+@app.post("/api/leaves", response_model=LeaveResponse, status_code=status.HTTP_201_CREATED)
+async def request_leave(
+    leave: LeaveCreate,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Request leave for the current employee; overlapping requests are rejected"""
+    if leave.end_date < leave.start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date"
+        )
+    employee_id = (await db.execute(select(Employee.id).where(Employee.user_id == current_user.id))).scalar()
+    if employee_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Employee profile not found"
+        )
+    try:
+        return await create_leave(db, employee_id, leave.leave_type, leave.start_date, leave.end_date, leave.reason)
+    except UnknownLeaveTypeError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except (LeaveConflictError, InsufficientLeaveBalanceError) as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+async def _decide(leave_id: int, approve: bool, current_user: UserPrincipal, db: AsyncSession):
+    try:
+        leave = await decide_leave(db, leave_id, approve, current_user.id)
+    except LeaveStateError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if leave is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Leave not found"
+        )
+    return leave
+
+@app.post("/api/leaves/{leave_id}/approve", response_model=LeaveResponse)
+async def approve_leave(
+    leave_id: int,
+    current_user: UserPrincipal = Depends(require_roles("hr", "manager")),
+    db: AsyncSession = Depends(get_db)
+):
+    """Approve a pending leave; its days move from pending to used"""
+    return await _decide(leave_id, True, current_user, db)
+
+@app.post("/api/leaves/{leave_id}/reject", response_model=LeaveResponse)
+async def reject_leave(
+    leave_id: int,
+    current_user: UserPrincipal = Depends(require_roles("hr", "manager")),
+    db: AsyncSession = Depends(get_db)
+):
+    """Reject a pending leave; its days are released"""
+    return await _decide(leave_id, False, current_user, db)
+
+@app.get("/api/leaves/balance", response_model=List[LeaveBalanceResponse])
+@query_budget(3)
+async def read_leave_balance(
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Current employee's leave balances for a year (default: this year), read from the ledger"""
+    employee_id = (await db.execute(select(Employee.id).where(Employee.user_id == current_user.id))).scalar()
+    if employee_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Employee profile not found"
+        )
+    return await get_balances(db, employee_id, year or date.today().year)
+
+def _check_window(start: date, end: date):
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start"
+        )
+    if (end - start).days + 1 > settings.LEAVE_CALENDAR_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Window is limited to {settings.LEAVE_CALENDAR_MAX_DAYS} days"
+        )
+
+@app.get("/api/leaves/calendar", response_model=List[LeaveCalendarEntry])
+@query_budget(4)
+async def read_leave_calendar(
+    start: date,
+    end: date,
+    department: Optional[str] = None,
+    include_pending: bool = False,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Who is out in a date window, optionally for one department"""
+    _check_window(start, end)
+    return FastJSONResponse(await leave_calendar(db, start, end, department, include_pending))
+
+@app.get("/api/leaves/availability", response_model=List[TeamAvailabilityDay])
+@query_budget(5)
+async def read_team_availability(
+    start: date,
+    end: date,
+    department: Optional[str] = None,
+    current_user: UserPrincipal = Depends(require_roles("hr", "manager")),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Per-day headcount versus people on approved leave"""
+    _check_window(start, end)
+    return FastJSONResponse(await team_availability(db, start, end, department))
+
+@app.post("/api/payroll/run", response_model=PayrollRunReport)
+async def run_monthly_payroll(
+    run: PayrollRunRequest,
+    current_user: UserPrincipal = Depends(require_roles("hr"))
+):
+    """Compute and store the month's payroll for all employees"""
+    return await run_payroll(run.month, run.year)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Hello from HRMS Backend on Railway!", "status": "success", "timestamp": "2024-01-01T00:00:00Z"}
 
 @app.get("/api/test")
-def test_endpoint():
+async def test_endpoint():
     return {"message": "Test endpoint working", "status": "success"}
 
+@app.get("/api/cache/stats")
+async def cache_stats(current_user: UserPrincipal = Depends(require_roles("hr"))):
+    """Hit/miss counters for the in-process caches of this worker"""
+    return {"user_cache": user_cache.stats(), "token_cache": token_cache.stats()}
+
 @app.get("/api/health")
-def health_check():
-    """Health check endpoint for Railway"""
-    try:
-        # Test database connection
-        db = next(get_db())
-        db.execute("SELECT 1")
-        db.close()
+async def health_check():
+    """Health check endpoint for Railway, answered from the background probe"""
+    if health_monitor.database_ok:
         return {
             "status": "healthy",
             "database": "connected",
             "message": "HRMS Backend is running successfully on Railway"
         }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return {
-            "status": "unhealthy",
-            "database": "disconnected",
-            "error": str(e)
-        }
+    return {
+        "status": "unhealthy",
+        "database": "disconnected",
+        "error": health_monitor.error
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (all workers when PROMETHEUS_MULTIPROC_DIR is set)"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness: the process is serving requests (no dependencies checked)"""
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness from cached probe results and pool counters; 503 routes traffic elsewhere"""
+    ready, reasons, snapshot = health_monitor.readiness()
+    if replica_monitor is not None:
+        # Informational only: reads fall back to the primary while the replica is down
+        snapshot["replica"] = replica_monitor.snapshot()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not_ready", "reasons": reasons, **snapshot},
+    )
 
 if __name__ == "__main__":
     import uvicorn
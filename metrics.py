@@ -0,0 +1,130 @@
+"""
+Prometheus metrics.
+
+Everything is recorded in-process. When PROMETHEUS_MULTIPROC_DIR is set
+(required with several workers) prometheus_client writes values to mmapped
+files in that directory and /metrics aggregates every worker's files; the
+directory must be emptied before the server starts.
+
+Every metric is labelled, so nothing is written until first use; the
+hashing pool's child processes import this module through auth.py and
+must not leave files behind.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "hrms_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "hrms_http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "hrms_db_queries_per_request",
+    "SQL statements executed while serving one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "hrms_db_time_per_request_seconds",
+    "Time spent in SQL statements while serving one request",
+    ["route"],
+)
+DB_QUERY_DURATION = Histogram(
+    "hrms_db_query_duration_seconds",
+    "Duration of individual SQL statements",
+    ["engine"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "hrms_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_READS_ROUTED = Counter(
+    "hrms_db_reads_routed_total",
+    "Sessions opened for read-only routes, by the database they were routed to",
+    ["target", "reason"],
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "hrms_password_hash_duration_seconds",
+    "bcrypt work per call, measured around the hashing pool",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5, 10, 30),
+)
+AUTH_REJECTIONS = Counter(
+    "hrms_auth_rejections_total",
+    "Login/register attempts turned away by admission control",
+    ["route", "reason"],
+)
+JWT_DECODE_FAILURES = Counter(
+    "hrms_jwt_decode_failures_total",
+    "Bearer tokens that failed to decode",
+    ["reason"],
+)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency by route template and in-flight requests.
+
+    Per-request SQL metrics come from the request's QueryProfile (sql_profiler).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            # The route template keeps label cardinality bounded (no raw paths)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(method, template, str(status_code)).observe(elapsed)
+
+def render_metrics() -> bytes:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def mark_worker_dead():
+    """Drop this worker's live gauges from the shared directory on shutdown"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
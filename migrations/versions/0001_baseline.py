@@ -0,0 +1,126 @@
+"""Baseline: the schema previously created by Base.metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 20:45:08.088435
+
+Databases created by create_all before migrations existed match this
+revision: run `alembic stamp 0001` on them, then `alembic upgrade head`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('employee_id', sa.String(length=50), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.String(length=50), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+    op.create_index('idx_users_created_at', 'users', ['created_at'], unique=False)
+    op.create_index('idx_users_role', 'users', ['role'], unique=False)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_employee_id', 'users', ['employee_id'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+
+    op.create_table('employees',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=False),
+    sa.Column('last_name', sa.String(length=100), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('department', sa.String(length=100), nullable=True),
+    sa.Column('position', sa.String(length=100), nullable=True),
+    sa.Column('hire_date', sa.Date(), nullable=True),
+    sa.Column('salary', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index('idx_employees_department', 'employees', ['department'], unique=False)
+    op.create_index('idx_employees_hire_date', 'employees', ['hire_date'], unique=False)
+    op.create_index('idx_employees_name', 'employees', ['first_name', 'last_name'], unique=False)
+    op.create_index('idx_employees_position', 'employees', ['position'], unique=False)
+    op.create_index('ix_employees_id', 'employees', ['id'], unique=False)
+
+    op.create_table('attendance',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('check_in', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('check_out', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_attendance_date', 'attendance', ['date'], unique=False)
+    op.create_index('idx_attendance_employee_date', 'attendance', ['employee_id', 'date'], unique=False)
+    op.create_index('idx_attendance_status', 'attendance', ['status'], unique=False)
+    op.create_index('ix_attendance_id', 'attendance', ['id'], unique=False)
+
+    op.create_table('leaves',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('leave_type', sa.String(length=50), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('days_requested', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('approved_by', sa.Integer(), nullable=True),
+    sa.Column('approved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['approved_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_leaves_dates', 'leaves', ['start_date', 'end_date'], unique=False)
+    op.create_index('idx_leaves_employee', 'leaves', ['employee_id'], unique=False)
+    op.create_index('idx_leaves_status', 'leaves', ['status'], unique=False)
+    op.create_index('idx_leaves_type', 'leaves', ['leave_type'], unique=False)
+    op.create_index('ix_leaves_id', 'leaves', ['id'], unique=False)
+
+    op.create_table('payroll',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('basic_salary', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('allowances', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('deductions', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('net_salary', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('payment_date', sa.Date(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_payroll_employee_month_year', 'payroll', ['employee_id', 'month', 'year'], unique=False)
+    op.create_index('idx_payroll_month_year', 'payroll', ['month', 'year'], unique=False)
+    op.create_index('idx_payroll_status', 'payroll', ['status'], unique=False)
+    op.create_index('ix_payroll_id', 'payroll', ['id'], unique=False)
+
+
+def downgrade():
+    # Dropping a table drops its indexes
+    for table in ('payroll', 'leaves', 'attendance', 'employees', 'users'):
+        op.drop_table(table)
@@ -0,0 +1,101 @@
+"""Index changes and rollup tables added since the baseline
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 21:30:12.514208
+
+Bump database.SCHEMA_REVISION to this revision id.
+
+- idx_attendance_employee_date becomes unique (check-in/out upserts on it).
+  Duplicate (employee_id, date) rows must be merged before upgrading.
+- idx_employees_department / idx_employees_position gain a trailing id for
+  directory keyset pages.
+- idx_users_employee_id_lower for case-insensitive employee id logins.
+- attendance_monthly_summaries and leave_balances.
+- PostgreSQL only: the pg_trgm name index (search.py) and the leave
+  daterange GiST index (leaves.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('idx_attendance_employee_date', table_name='attendance')
+    op.create_index('idx_attendance_employee_date', 'attendance', ['employee_id', 'date'], unique=True)
+
+    op.drop_index('idx_employees_department', table_name='employees')
+    op.create_index('idx_employees_department', 'employees', ['department', 'id'], unique=False)
+    op.drop_index('idx_employees_position', table_name='employees')
+    op.create_index('idx_employees_position', 'employees', ['position', 'id'], unique=False)
+
+    op.create_index('idx_users_employee_id_lower', 'users', [sa.text('lower(employee_id)')], unique=False)
+
+    op.create_table('attendance_monthly_summaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('present_days', sa.Integer(), nullable=False),
+    sa.Column('late_days', sa.Integer(), nullable=False),
+    sa.Column('half_days', sa.Integer(), nullable=False),
+    sa.Column('absent_days', sa.Integer(), nullable=False),
+    sa.Column('total_hours', sa.Numeric(precision=8, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_attendance_summary_employee_month', 'attendance_monthly_summaries', ['employee_id', 'year', 'month'], unique=True)
+    op.create_index('idx_attendance_summary_month', 'attendance_monthly_summaries', ['year', 'month'], unique=False)
+    op.create_index('ix_attendance_monthly_summaries_id', 'attendance_monthly_summaries', ['id'], unique=False)
+
+    op.create_table('leave_balances',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('leave_type', sa.String(length=50), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('used_days', sa.Integer(), nullable=False),
+    sa.Column('pending_days', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_leave_balances_employee_type_year', 'leave_balances', ['employee_id', 'leave_type', 'year'], unique=True)
+    op.create_index('ix_leave_balances_id', 'leave_balances', ['id'], unique=False)
+
+    if op.get_bind().dialect.name == "postgresql":
+        # Same DDL as the after_create listeners in search.py and leaves.py
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_employees_name_trgm ON employees "
+            "USING gin (lower(first_name || ' ' || last_name) gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_leaves_daterange ON leaves "
+            "USING gist (daterange(start_date, end_date, '[]'))"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS idx_leaves_daterange")
+        op.execute("DROP INDEX IF EXISTS idx_employees_name_trgm")
+
+    op.drop_table('leave_balances')
+    op.drop_table('attendance_monthly_summaries')
+
+    op.drop_index('idx_users_employee_id_lower', table_name='users')
+
+    op.drop_index('idx_employees_position', table_name='employees')
+    op.create_index('idx_employees_position', 'employees', ['position'], unique=False)
+    op.drop_index('idx_employees_department', table_name='employees')
+    op.create_index('idx_employees_department', 'employees', ['department'], unique=False)
+
+    op.drop_index('idx_attendance_employee_date', table_name='attendance')
+    op.create_index('idx_attendance_employee_date', 'attendance', ['employee_id', 'date'], unique=False)
@@ -23,6 +23,7 @@ class User(Base):
     # PostgreSQL specific indexes
     __table_args__ = (
         Index('idx_users_email_lower', func.lower(email)),
+        Index('idx_users_employee_id_lower', func.lower(employee_id)),
         Index('idx_users_role', role),
         Index('idx_users_created_at', created_at),
     )
@@ -49,8 +50,9 @@ class Employee(Base):
     # PostgreSQL specific indexes
     __table_args__ = (
         Index('idx_employees_name', first_name, last_name),
-        Index('idx_employees_department', department),
-        Index('idx_employees_position', position),
+        # Trailing id lets directory keyset pages (filter, then id > cursor) scan the index in order
+        Index('idx_employees_department', department, id),
+        Index('idx_employees_position', position, id),
         Index('idx_employees_hire_date', hire_date),
     )
 
@@ -72,7 +74,8 @@ class Attendance(Base):
     
     # PostgreSQL specific indexes
     __table_args__ = (
-        Index('idx_attendance_employee_date', employee_id, date),
+        # Unique so check-in/out ingestion can upsert on (employee_id, date)
+        Index('idx_attendance_employee_date', employee_id, date, unique=True),
         Index('idx_attendance_date', date),
         Index('idx_attendance_status', status),
     )
@@ -128,3 +131,61 @@ class Payroll(Base):
         Index('idx_payroll_month_year', month, year),
         Index('idx_payroll_status', status),
     )
+
+class AttendanceMonthlySummary(Base):
+    """Per-employee monthly attendance rollup, maintained as attendance is written"""
+    __tablename__ = "attendance_monthly_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)  # 1-12
+    present_days = Column(Integer, default=0, nullable=False)
+    late_days = Column(Integer, default=0, nullable=False)
+    half_days = Column(Integer, default=0, nullable=False)
+    absent_days = Column(Integer, default=0, nullable=False)
+    total_hours = Column(Numeric(8, 2), default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    employee = relationship("Employee")
+    
+    # PostgreSQL specific indexes
+    __table_args__ = (
+        Index('idx_attendance_summary_employee_month', employee_id, year, month, unique=True),
+        Index('idx_attendance_summary_month', year, month),
+    )
+
+class LeaveBalance(Base):
+    """Leave days used and pending per employee, type and year, maintained as leaves are decided"""
+    __tablename__ = "leave_balances"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+    leave_type = Column(String(50), nullable=False)
+    year = Column(Integer, nullable=False)
+    used_days = Column(Integer, default=0, nullable=False)
+    pending_days = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    employee = relationship("Employee")
+    
+    # PostgreSQL specific indexes
+    __table_args__ = (
+        Index('idx_leave_balances_employee_type_year', employee_id, leave_type, year, unique=True),
+    )
+
+class ImportJob(Base):
+    """A bulk employee import running in the background, with its report once finished"""
+    __tablename__ = "import_jobs"
+    
+    id = Column(String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    status = Column(String(20), default="queued", nullable=False)  # queued, running, completed, failed
+    filename = Column(String(255))
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    report = Column(Text)  # ImportReport as JSON once completed
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
@@ -0,0 +1,199 @@
+import asyncio
+import calendar
+import logging
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, select
+
+from config import settings
+from database import AsyncSessionLocal
+from models import AttendanceMonthlySummary, Employee, Leave, Payroll
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+HALF = Decimal("0.5")
+UNPAID_LEAVE_TYPES = tuple(
+    leave_type.strip().lower() for leave_type in settings.PAYROLL_UNPAID_LEAVE_TYPES.split(",") if leave_type.strip()
+)
+
+# Single-key advisory locks (a key space separate from the two-key locks in
+# rollups.py); the month index is added to this prefix ("PAY" in ASCII)
+PAYROLL_LOCK_PREFIX = 0x504159 << 32
+
+async def lock_payroll_month(db, year: int, month: int):
+    """Hold a transaction-level lock on the month's payroll until the caller commits.
+
+    Under READ COMMITTED two overlapping runs would each delete only the
+    pending rows they could see and both insert, duplicating every
+    employee's row. SQLite needs nothing: the DELETE takes its write lock.
+    """
+    if (await db.connection()).dialect.name != "postgresql":
+        return
+    await db.execute(select(func.pg_advisory_xact_lock(PAYROLL_LOCK_PREFIX + year * 12 + month - 1)))
+
+def working_days(year: int, month: int, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Count Monday-Friday days of the month, optionally clipped to [start, end]"""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    start = max(first, start) if start else first
+    end = min(last, end) if end else last
+    days = 0
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            days += 1
+        current += timedelta(days=1)
+    return days
+
+def compute_payroll(columns: Dict[str, list], month_working_days: int) -> Dict[str, list]:
+    """Compute payroll columns for a block of employees.
+
+    ``columns`` holds parallel lists: employee_id, salary (the monthly
+    basic, as in the seed data), absent_days, half_days and
+    unpaid_leave_days. Unpaid days are deducted at basic / working days.
+    Money stays Decimal end to end and every amount is rounded half-up to
+    cents, so stored rows add up exactly.
+    """
+    allowance_rate = Decimal(settings.PAYROLL_ALLOWANCE_RATE)
+    divisor = Decimal(month_working_days or 1)
+    basic = [Decimal(salary).quantize(CENT, ROUND_HALF_UP) for salary in columns["salary"]]
+    unpaid_days = [
+        min(Decimal(absent) + HALF * half + Decimal(leave), divisor)
+        for absent, half, leave in zip(columns["absent_days"], columns["half_days"], columns["unpaid_leave_days"])
+    ]
+    allowances = [(amount * allowance_rate).quantize(CENT, ROUND_HALF_UP) for amount in basic]
+    deductions = [(amount * days / divisor).quantize(CENT, ROUND_HALF_UP) for amount, days in zip(basic, unpaid_days)]
+    net = [b + a - d for b, a, d in zip(basic, allowances, deductions)]
+    return {
+        "employee_id": list(columns["employee_id"]),
+        "basic_salary": basic,
+        "allowances": allowances,
+        "deductions": deductions,
+        "net_salary": net,
+    }
+
+def _department_filter(department: Optional[str]):
+    if department is None:
+        return Employee.department.is_(None)
+    return Employee.department == department
+
+async def load_department_columns(department: Optional[str], year: int, month: int) -> Dict[str, list]:
+    """Load one department's inputs as columns using grouped queries, not per-employee ORM loads"""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    in_department = _department_filter(department)
+    async with AsyncSessionLocal() as db:
+        already_paid = (
+            select(Payroll.employee_id)
+            .where(Payroll.month == month, Payroll.year == year, Payroll.status == "paid")
+        )
+        employees = (await db.execute(
+            select(Employee.id, Employee.salary)
+            .where(in_department, Employee.salary.isnot(None), Employee.id.notin_(already_paid))
+            .order_by(Employee.id)
+        )).all()
+        if not employees:
+            return {}
+
+        # Absences come from the maintained monthly rollup, not raw attendance
+        attendance = (await db.execute(
+            select(
+                AttendanceMonthlySummary.employee_id,
+                AttendanceMonthlySummary.absent_days,
+                AttendanceMonthlySummary.half_days,
+            )
+            .join(Employee, Employee.id == AttendanceMonthlySummary.employee_id)
+            .where(in_department, AttendanceMonthlySummary.year == year, AttendanceMonthlySummary.month == month)
+        )).all()
+
+        unpaid_leaves = []
+        if UNPAID_LEAVE_TYPES:
+            unpaid_leaves = (await db.execute(
+                select(Leave.employee_id, Leave.start_date, Leave.end_date)
+                .join(Employee, Employee.id == Leave.employee_id)
+                .where(
+                    in_department,
+                    Leave.status == "approved",
+                    Leave.leave_type.in_(UNPAID_LEAVE_TYPES),
+                    and_(Leave.start_date <= last, Leave.end_date >= first),
+                )
+            )).all()
+
+    absent = {employee_id: absent_days for employee_id, absent_days, _ in attendance}
+    half = {employee_id: half_days for employee_id, _, half_days in attendance}
+    leave_days: Dict[int, int] = {}
+    for employee_id, start_date, end_date in unpaid_leaves:
+        leave_days[employee_id] = leave_days.get(employee_id, 0) + working_days(year, month, start_date, end_date)
+
+    ids = [employee_id for employee_id, _ in employees]
+    return {
+        "employee_id": ids,
+        "salary": [salary for _, salary in employees],
+        "absent_days": [absent.get(employee_id, 0) for employee_id in ids],
+        "half_days": [half.get(employee_id, 0) for employee_id in ids],
+        "unpaid_leave_days": [leave_days.get(employee_id, 0) for employee_id in ids],
+    }
+
+async def run_payroll(month: int, year: int) -> dict:
+    """Compute and store the month's payroll for every employee.
+
+    Departments are loaded and computed concurrently; the results replace
+    the month's pending rows in a single transaction, serialized per month
+    so overlapping runs can't both insert. Rows already marked paid are
+    left untouched.
+    """
+    month_working_days = working_days(year, month)
+    async with AsyncSessionLocal() as db:
+        departments = list((await db.execute(select(Employee.department).distinct())).scalars())
+
+    limit = asyncio.Semaphore(max(1, settings.PAYROLL_PARALLELISM))
+
+    async def process(department):
+        async with limit:
+            columns = await load_department_columns(department, year, month)
+            if not columns:
+                return None
+            return compute_payroll(columns, month_working_days)
+
+    results = [result for result in await asyncio.gather(*(process(d) for d in departments)) if result]
+    rows: List[dict] = []
+    for result in results:
+        rows.extend(
+            {
+                "employee_id": employee_id,
+                "month": month,
+                "year": year,
+                "basic_salary": basic,
+                "allowances": allowance,
+                "deductions": deduction,
+                "net_salary": net,
+                "status": "pending",
+            }
+            for employee_id, basic, allowance, deduction, net in zip(
+                result["employee_id"], result["basic_salary"], result["allowances"],
+                result["deductions"], result["net_salary"],
+            )
+        )
+
+    async with AsyncSessionLocal() as db:
+        await lock_payroll_month(db, year, month)
+        await db.execute(
+            delete(Payroll).where(Payroll.month == month, Payroll.year == year, Payroll.status == "pending")
+        )
+        if rows:
+            await db.execute(insert(Payroll), rows)
+        await db.commit()
+
+    total_net = sum((row["net_salary"] for row in rows), Decimal("0.00"))
+    logger.info(f"Payroll run {year}-{month:02d}: {len(rows)} employees across {len(departments)} departments")
+    return {
+        "month": month,
+        "year": year,
+        "working_days": month_working_days,
+        "departments": len(departments),
+        "employees": len(rows),
+        "total_net_salary": total_net,
+    }
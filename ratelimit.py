@@ -0,0 +1,162 @@
+"""
+Admission control for the password routes (login and register).
+
+Every admitted attempt can cost a bcrypt call, so attempts are screened
+before any database or hashing work:
+
+- a token bucket per client IP (429 when empty),
+- a token bucket per login identifier (429 when empty). Every attempt
+  takes a token up front, so concurrent guesses can't outrun the bucket;
+  successful logins and attempts that never reached a verdict give it back,
+  so only failures count against the account,
+- a cap on attempts in flight in this worker (503), so a flood from many
+  addresses queues at most AUTH_MAX_IN_FLIGHT attempts in front of
+  legitimate ones instead of hundreds.
+
+Buckets live in bounded LRU maps of fixed-size keys, so memory stays
+constant however many addresses or identifiers are seen; an evicted
+bucket is simply full again, as it would be after idling. State is per
+worker; rates and bursts are divided by WEB_CONCURRENCY so the instance
+as a whole enforces roughly the configured limits.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Hashable, Optional
+
+from config import settings
+from metrics import AUTH_REJECTIONS
+
+class RateLimitedError(Exception):
+    """The client or identifier has no attempts left; retry after ``retry_after`` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionRejectedError(Exception):
+    """Too many password attempts are already in flight"""
+
+class TokenBuckets:
+    """Token bucket per key: ``rate`` tokens a second up to ``burst``, at most ``maxsize`` keys (LRU)"""
+
+    def __init__(self, rate: float, burst: float, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key: Hashable, now: float) -> float:
+        entry = self._buckets.get(key)
+        if entry is None:
+            return self.burst
+        tokens, updated = entry
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def take(self, key: Hashable) -> float:
+        """Take a token if there is one; returns 0 if taken, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            taken = tokens >= 1
+            if taken:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return 0.0 if taken else (1 - tokens) / self.rate
+
+    def refund(self, key: Hashable):
+        """Return a token taken by take()"""
+        now = time.monotonic()
+        with self._lock:
+            if key in self._buckets:
+                self._buckets[key] = (min(self.burst, self._tokens(key, now) + 1), now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+def _digest(value: str) -> bytes:
+    # Fixed-size keys, however long the submitted identifier is
+    return hashlib.blake2b(value.strip().lower().encode(), digest_size=16).digest()
+
+class AuthAdmission:
+    """Per-IP and per-identifier buckets plus an in-flight cap for the password routes"""
+
+    def __init__(self, ip_rate_per_minute: float, ip_burst: float, identifier_rate_per_minute: float,
+                 identifier_burst: float, max_keys: int, max_in_flight: int, workers: int = 1, enabled: bool = True):
+        self.enabled = enabled
+        self.by_ip = TokenBuckets(ip_rate_per_minute / 60 / workers, max(1.0, ip_burst / workers), max_keys)
+        self.by_identifier = TokenBuckets(
+            identifier_rate_per_minute / 60 / workers, max(1.0, identifier_burst / workers), max_keys
+        )
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    def _reject(self, route: str, reason: str, retry_after: Optional[float] = None):
+        AUTH_REJECTIONS.labels(route, reason).inc()
+        if retry_after is None:
+            raise AdmissionRejectedError("Too many sign-in attempts in progress, try again shortly")
+        raise RateLimitedError("Too many attempts, try again later", retry_after)
+
+    @asynccontextmanager
+    async def admit(self, route: str, client_ip: Optional[str], identifier: Optional[str] = None):
+        """Hold an in-flight slot for one attempt, or raise before any work is done.
+
+        The identifier's token is kept unless the attempt is settled with
+        record_success() or raises (no verdict was reached).
+        """
+        if not self.enabled:
+            yield
+            return
+        if client_ip is not None:
+            wait = self.by_ip.take(client_ip)
+            if wait:
+                self._reject(route, "ip", wait)
+        key = _digest(identifier) if identifier is not None else None
+        if key is not None:
+            wait = self.by_identifier.take(key)
+            if wait:
+                self._reject(route, "identifier", wait)
+        if self.in_flight >= self.max_in_flight:
+            # Shed for load, not for anything the client did: charge neither bucket
+            if client_ip is not None:
+                self.by_ip.refund(client_ip)
+            if key is not None:
+                self.by_identifier.refund(key)
+            self._reject(route, "in_flight")
+        self.in_flight += 1
+        try:
+            yield
+        except BaseException:
+            if key is not None:
+                self.by_identifier.refund(key)
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def record_success(self, identifier: str):
+        """Give back the token a successful login took from its identifier"""
+        if not self.enabled:
+            return
+        self.by_identifier.refund(_digest(identifier))
+
+auth_admission = AuthAdmission(
+    settings.AUTH_IP_RATE_PER_MINUTE,
+    settings.AUTH_IP_BURST,
+    settings.AUTH_IDENTIFIER_FAILURES_PER_MINUTE,
+    settings.AUTH_IDENTIFIER_BURST,
+    settings.AUTH_LIMITER_MAX_KEYS,
+    settings.AUTH_MAX_IN_FLIGHT,
+    settings.WEB_CONCURRENCY,
+    settings.AUTH_RATE_LIMIT_ENABLED,
+)
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
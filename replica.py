@@ -0,0 +1,143 @@
+"""
+Read-replica routing.
+
+Read-only routes take their session from get_read_db instead of get_db.
+When DATABASE_REPLICA_URL is set and the replica's health probe passes,
+those sessions come from the replica pool; everything else (writes,
+authentication, the in-process index refreshers) stays on the primary.
+
+Read-your-writes: ReadYourWritesMiddleware stamps every successful write
+response with the write time, signed with JWT_SECRET, in the
+``hrms_last_write`` cookie and the ``X-Last-Write`` header. Reads that send
+the stamp back (cookie, or the header for clients without a cookie jar)
+within the sticky window go to the primary, whichever worker or instance
+serves them. Each worker also remembers its own writers' bearer tokens, so
+clients that return neither still get it when they hit the same worker.
+
+The sticky window is at least REPLICA_MAX_LAG_SECONDS plus the probe
+interval: a replica only leaves rotation once a probe sees it lagging, so
+until then it may be up to that far behind.
+"""
+
+import hashlib
+import hmac
+import logging
+import math
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+
+from cache import TTLCache
+from config import settings
+from database import AsyncSessionLocal, ReplicaSessionLocal
+from health import replica_monitor
+from metrics import DB_READS_ROUTED
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+WRITE_COOKIE = "hrms_last_write"
+WRITE_HEADER = "x-last-write"
+
+MIN_STICKY_SECONDS = settings.REPLICA_MAX_LAG_SECONDS + settings.HEALTH_PROBE_INTERVAL_SECONDS
+STICKY_SECONDS = settings.REPLICA_STICKY_SECONDS or MIN_STICKY_SECONDS
+if STICKY_SECONDS < MIN_STICKY_SECONDS:
+    logger.warning(
+        f"REPLICA_STICKY_SECONDS={STICKY_SECONDS:g} is shorter than REPLICA_MAX_LAG_SECONDS + "
+        f"HEALTH_PROBE_INTERVAL_SECONDS; using {MIN_STICKY_SECONDS:g} so clients read their own writes"
+    )
+    STICKY_SECONDS = MIN_STICKY_SECONDS
+
+# Digest of the Authorization header -> True, for clients that wrote recently
+_recent_writers = TTLCache(settings.REPLICA_STICKY_MAX_CLIENTS, STICKY_SECONDS)
+
+def client_key(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode("latin-1")).hexdigest()
+
+def _signature(millis: str) -> str:
+    return hmac.new(settings.JWT_SECRET.encode(), f"last-write:{millis}".encode(), hashlib.sha256).hexdigest()[:32]
+
+def write_stamp(now: Optional[float] = None) -> str:
+    """Signed "<unix ms>.<signature>" marking a write made at ``now``"""
+    millis = str(int((time.time() if now is None else now) * 1000))
+    return f"{millis}.{_signature(millis)}"
+
+def stamp_is_recent(stamp: Optional[str]) -> bool:
+    """Whether ``stamp`` is a genuine write stamp from within the sticky window"""
+    if not stamp:
+        return False
+    millis, _, signature = stamp.partition(".")
+    if not millis.isdigit() or not hmac.compare_digest(signature, _signature(millis)):
+        return False
+    return 0 <= time.time() - int(millis) / 1000 < STICKY_SECONDS
+
+def mark_write(authorization: Optional[str]):
+    """Send this client's reads to this worker's primary pool for the sticky window"""
+    key = client_key(authorization)
+    if key is not None:
+        _recent_writers.set(key, True)
+
+def route_read(request: Request) -> str:
+    """Why a read-only request goes where it goes: "replica", "sticky", "unhealthy" or "no_replica" """
+    if replica_monitor is None:
+        return "no_replica"
+    if not replica_monitor.database_ok:
+        return "unhealthy"
+    if stamp_is_recent(request.cookies.get(WRITE_COOKIE)) or stamp_is_recent(request.headers.get(WRITE_HEADER)):
+        return "sticky"
+    key = client_key(request.headers.get("authorization"))
+    if key is not None and _recent_writers.get(key):
+        return "sticky"
+    return "replica"
+
+def read_sessionmaker(request: Request):
+    """Session factory for a read-only request (replica or primary, see route_read)"""
+    reason = route_read(request)
+    DB_READS_ROUTED.labels("replica" if reason == "replica" else "primary", reason).inc()
+    return ReplicaSessionLocal if reason == "replica" else AsyncSessionLocal
+
+async def get_read_db(request: Request):
+    """get_db for read-only routes"""
+    session_factory = read_sessionmaker(request)
+    async with session_factory() as db:
+        try:
+            yield db
+        except DBAPIError as e:
+            # Stop routing to a replica that dropped its connection without
+            # waiting for the next probe; this request still fails
+            if session_factory is ReplicaSessionLocal and e.connection_invalidated:
+                replica_monitor.mark_failed(e)
+            raise
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware: stamps responses to successful writes (see write_stamp and mark_write)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or replica_monitor is None or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        authorization = next((value for name, value in scope["headers"] if name == b"authorization"), None)
+
+        async def send_and_mark(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                if authorization is not None:
+                    mark_write(authorization.decode("latin-1"))
+                stamp = write_stamp().encode()
+                cookie = (
+                    f"{WRITE_COOKIE}={stamp.decode()}; Max-Age={math.ceil(STICKY_SECONDS)}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                ).encode()
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"set-cookie", cookie), (WRITE_HEADER.encode(), stamp)],
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_and_mark)
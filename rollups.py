@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Monthly attendance rollups.
+
+attendance_monthly_summaries holds one row per employee and month. Every
+attendance write refreshes the rows for the months it touched from at most
+a month of raw rows per employee, so summary reads never scan history.
+Recomputes of the same employee-month are serialized, so a group-commit
+flush and an HR correction can't each overwrite the other's count.
+Run ``python rollups.py --rebuild`` to backfill or repair the table.
+"""
+
+import argparse
+import asyncio
+import calendar
+import logging
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import Integer, bindparam, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from crud import dialect_insert
+from database import AsyncSessionLocal
+from models import Attendance, AttendanceMonthlySummary
+
+logger = logging.getLogger(__name__)
+
+MonthKey = Tuple[int, int, int]  # (employee_id, year, month)
+
+COUNTED_STATUSES = {
+    "present": "present_days",
+    "late": "late_days",
+    "half-day": "half_days",
+    "absent": "absent_days",
+}
+UPSERT_BATCH_SIZE = 1000
+
+def _empty_summary(key: MonthKey) -> dict:
+    employee_id, year, month = key
+    return {
+        "employee_id": employee_id,
+        "year": year,
+        "month": month,
+        "present_days": 0,
+        "late_days": 0,
+        "half_days": 0,
+        "absent_days": 0,
+        "total_hours": Decimal("0"),
+    }
+
+def summarize(rows: Iterable, keys: Iterable[MonthKey] = ()) -> Dict[MonthKey, dict]:
+    """Fold raw (employee_id, date, status, check_in, check_out) rows into summaries.
+
+    Every key in ``keys`` gets a summary even without rows, so a correction
+    that empties a month resets it to zero.
+    """
+    summaries = {key: _empty_summary(key) for key in keys}
+    for employee_id, day, status, check_in, check_out in rows:
+        key = (employee_id, day.year, day.month)
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = _empty_summary(key)
+        column = COUNTED_STATUSES.get(status)
+        if column:
+            summary[column] += 1
+        if check_in is not None and check_out is not None and check_out > check_in:
+            summary["total_hours"] += Decimal((check_out - check_in).total_seconds()) / 3600
+    for summary in summaries.values():
+        summary["total_hours"] = summary["total_hours"].quantize(Decimal("0.01"), ROUND_HALF_UP)
+    return summaries
+
+async def upsert_summaries(db, summaries: Iterable[dict]):
+    """Write summaries keyed on (employee_id, year, month); the caller commits"""
+    summaries = list(summaries)
+    if not summaries:
+        return
+    dialect = (await db.connection()).dialect.name
+    for start in range(0, len(summaries), UPSERT_BATCH_SIZE):
+        stmt = dialect_insert(dialect, AttendanceMonthlySummary).values(summaries[start:start + UPSERT_BATCH_SIZE])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                AttendanceMonthlySummary.employee_id,
+                AttendanceMonthlySummary.year,
+                AttendanceMonthlySummary.month,
+            ],
+            set_={
+                "present_days": excluded.present_days,
+                "late_days": excluded.late_days,
+                "half_days": excluded.half_days,
+                "absent_days": excluded.absent_days,
+                "total_hours": excluded.total_hours,
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+
+# Sorted keys are locked in one statement; unnest yields them in array order
+LOCK_MONTHS = text(
+    "SELECT count(pg_advisory_xact_lock(k.employee_id, k.month_index)) "
+    "FROM unnest(:employee_ids, :month_indexes) AS k(employee_id, month_index)"
+).bindparams(
+    bindparam("employee_ids", type_=ARRAY(Integer)),
+    bindparam("month_indexes", type_=ARRAY(Integer)),
+)
+
+async def lock_months(db, keys: Set[MonthKey]):
+    """Hold a transaction-level lock per employee-month until the caller commits.
+
+    Under READ COMMITTED, two writers of the same month would each miss the
+    other's uncommitted rows and the later commit would win. Waiting here
+    means the read that follows sees every earlier writer's rows. Keys are
+    taken in sorted order so concurrent batches can't deadlock. SQLite needs
+    nothing: the attendance write already holds its single write lock.
+    """
+    if (await db.connection()).dialect.name != "postgresql":
+        return
+    ordered = sorted(keys)
+    await db.execute(LOCK_MONTHS, {
+        "employee_ids": [employee_id for employee_id, _, _ in ordered],
+        "month_indexes": [year * 12 + month - 1 for _, year, month in ordered],
+    })
+
+async def refresh_rollups(db, keys: Set[MonthKey]):
+    """Recompute the given employee-months from their raw rows, inside the caller's transaction"""
+    if not keys:
+        return
+    await lock_months(db, keys)
+    employee_ids = {employee_id for employee_id, _, _ in keys}
+    first = min(date(year, month, 1) for _, year, month in keys)
+    last = max(date(year, month, calendar.monthrange(year, month)[1]) for _, year, month in keys)
+    result = await db.execute(
+        select(Attendance.employee_id, Attendance.date, Attendance.status, Attendance.check_in, Attendance.check_out)
+        .where(Attendance.employee_id.in_(employee_ids), Attendance.date >= first, Attendance.date <= last)
+    )
+    rows = [row for row in result if (row[0], row[1].year, row[1].month) in keys]
+    await upsert_summaries(db, summarize(rows, keys).values())
+
+async def rebuild_rollups(year: Optional[int] = None, month: Optional[int] = None) -> int:
+    """Rebuild summaries from raw attendance, optionally for one year or month"""
+    conditions = []
+    summary_conditions = []
+    if year is not None:
+        first = date(year, month or 1, 1)
+        last_month = month or 12
+        last = date(year, last_month, calendar.monthrange(year, last_month)[1])
+        conditions = [Attendance.date >= first, Attendance.date <= last]
+        summary_conditions.append(AttendanceMonthlySummary.year == year)
+        if month is not None:
+            summary_conditions.append(AttendanceMonthlySummary.month == month)
+
+    written = 0
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(AttendanceMonthlySummary).where(*summary_conditions))
+        rows = await db.stream(
+            select(Attendance.employee_id, Attendance.date, Attendance.status, Attendance.check_in, Attendance.check_out)
+            .where(*conditions)
+            .order_by(Attendance.employee_id, Attendance.date)
+            .execution_options(yield_per=10000)
+        )
+        # Rows arrive grouped by employee, so summaries are flushed per employee
+        pending, current_employee = [], None
+        async for row in rows:
+            if row[0] != current_employee and len(pending) >= 10000:
+                summaries = summarize(pending)
+                await upsert_summaries(db, summaries.values())
+                written += len(summaries)
+                pending = []
+            current_employee = row[0]
+            pending.append(tuple(row))
+        summaries = summarize(pending)
+        await upsert_summaries(db, summaries.values())
+        written += len(summaries)
+        await db.commit()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild monthly attendance rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute summaries from raw attendance")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", type=int)
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+    if args.month is not None and args.year is None:
+        parser.error("--month requires --year")
+    logging.basicConfig(level=logging.INFO)
+    written = asyncio.run(rebuild_rollups(args.year, args.month))
+    logger.info(f"Rebuilt {written} monthly attendance summaries")
+
+if __name__ == "__main__":
+    main()
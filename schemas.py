@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Literal, Optional
+from datetime import date, datetime
+from decimal import Decimal
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -47,3 +48,150 @@ class EmployeeResponse(EmployeeBase):
     
     class Config:
         orm_mode = True
+
+class EmployeeDirectoryEntry(BaseModel):
+    id: int
+    user_id: int
+    first_name: str
+    last_name: str
+    department: Optional[str] = None
+    position: Optional[str] = None
+    hire_date: Optional[date] = None
+
+class EmployeeSearchResult(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    department: Optional[str] = None
+    position: Optional[str] = None
+
+class EmployeeDirectoryPage(BaseModel):
+    items: List[EmployeeDirectoryEntry]
+    next_cursor: Optional[str] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    total_rows: int
+    created: int
+    failed: int
+    errors: List[ImportRowError]
+
+class ImportJobResponse(BaseModel):
+    id: str
+    status: str  # queued, running, completed, failed
+    filename: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    report: Optional[ImportReport] = None
+
+class BadgeEvent(BaseModel):
+    employee_id: int
+    kind: Literal["in", "out"]
+    timestamp: datetime
+
+class BadgeEventBatch(BaseModel):
+    events: List[BadgeEvent]
+
+class AttendanceAck(BaseModel):
+    employee_id: int
+    date: date
+    kind: str
+    timestamp: datetime
+
+class BadgeEventAck(BaseModel):
+    accepted: int
+
+class AttendanceCorrection(BaseModel):
+    status: Optional[Literal["present", "absent", "late", "half-day"]] = None
+    check_in: Optional[datetime] = None
+    check_out: Optional[datetime] = None
+    notes: Optional[str] = None
+
+class AttendanceResponse(BaseModel):
+    id: int
+    employee_id: int
+    date: date
+    check_in: Optional[datetime] = None
+    check_out: Optional[datetime] = None
+    status: Optional[str] = None
+    notes: Optional[str] = None
+    
+    class Config:
+        orm_mode = True
+
+class AttendanceSummary(BaseModel):
+    employee_id: int
+    year: int
+    month: int
+    present_days: int
+    late_days: int
+    half_days: int
+    absent_days: int
+    total_hours: Decimal
+
+class AttendanceReportRow(AttendanceSummary):
+    first_name: str
+    last_name: str
+    department: Optional[str] = None
+
+class LeaveCreate(BaseModel):
+    leave_type: str = Field(..., min_length=1, max_length=50)
+    start_date: date
+    end_date: date
+    reason: Optional[str] = None
+
+class LeaveResponse(BaseModel):
+    id: int
+    employee_id: int
+    leave_type: str
+    start_date: date
+    end_date: date
+    days_requested: int
+    reason: Optional[str] = None
+    status: Optional[str] = None
+    created_at: datetime
+    
+    class Config:
+        orm_mode = True
+
+class LeaveBalanceResponse(BaseModel):
+    leave_type: str
+    year: int
+    entitled_days: Optional[int] = None
+    used_days: int
+    pending_days: int
+    remaining_days: Optional[int] = None
+
+class LeaveCalendarEntry(BaseModel):
+    id: int
+    employee_id: int
+    first_name: str
+    last_name: str
+    department: Optional[str] = None
+    leave_type: str
+    start_date: date
+    end_date: date
+    status: str
+
+class TeamAvailabilityDay(BaseModel):
+    date: date
+    headcount: int
+    out: int
+    available: int
+
+class PayrollRunRequest(BaseModel):
+    month: int = Field(..., ge=1, le=12)
+    year: int = Field(..., ge=2000, le=2100)
+
+class PayrollRunReport(BaseModel):
+    month: int
+    year: int
+    working_days: int
+    departments: int
+    employees: int
+    total_net_salary: Decimal
@@ -0,0 +1,274 @@
+import asyncio
+import bisect
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import DDL, case, event, func, literal_column, or_, select
+
+from config import settings
+from database import AsyncSessionLocal, on_commit
+from models import Employee
+
+logger = logging.getLogger(__name__)
+
+# lower(first_name || ' ' || last_name), written so PostgreSQL matches it to the trigram index
+FULL_NAME = func.lower(Employee.first_name + literal_column("' '") + Employee.last_name)
+
+event.listen(
+    Employee.__table__,
+    "after_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+event.listen(
+    Employee.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS idx_employees_name_trgm ON employees "
+        "USING gin (lower(first_name || ' ' || last_name) gin_trgm_ops)"
+    ).execute_if(dialect="postgresql"),
+)
+
+SIMILARITY_THRESHOLD = 0.3
+# Incremental refreshes look back a little further to absorb app/database clock skew
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def trigrams(text: str) -> set:
+    """pg_trgm-style trigrams: each word padded with two leading and one trailing space"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class NameIndex:
+    """In-memory typeahead index over employee names.
+
+    A sorted array of "first last" and "last first" keys answers prefix
+    queries with two bisects; a trigram posting index answers fuzzy queries.
+    Prefix hits on the full name rank first, then last-name prefix hits,
+    then fuzzy matches by trigram similarity.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, dict] = {}
+        self._keys: List[Tuple[str, int]] = []
+        self._postings: Dict[str, set] = {}
+        self._gram_counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.loaded_at: Optional[datetime] = None
+        self.refreshed_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _index_keys(entry: dict) -> List[Tuple[str, int]]:
+        first, last = normalize(entry["first_name"]), normalize(entry["last_name"])
+        return [(f"{first} {last}", entry["id"]), (f"{last} {first}", entry["id"])]
+
+    def _remove_locked(self, employee_id: int):
+        entry = self._entries.pop(employee_id, None)
+        if entry is None:
+            return
+        for key in self._index_keys(entry):
+            position = bisect.bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+        self._gram_counts.pop(employee_id, None)
+        for gram in trigrams(self._index_keys(entry)[0][0]):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(employee_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def upsert(self, entry: dict):
+        with self._lock:
+            self._remove_locked(entry["id"])
+            self._entries[entry["id"]] = entry
+            for key in self._index_keys(entry):
+                bisect.insort(self._keys, key)
+            grams = trigrams(self._index_keys(entry)[0][0])
+            self._gram_counts[entry["id"]] = len(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(entry["id"])
+
+    def remove(self, employee_id: int):
+        with self._lock:
+            self._remove_locked(employee_id)
+
+    def load(self, entries: List[dict]):
+        """Replace the whole index in one pass (sorting once instead of per insert)"""
+        keys, postings, gram_counts = [], {}, {}
+        for entry in entries:
+            keys.extend(self._index_keys(entry))
+            grams = trigrams(self._index_keys(entry)[0][0])
+            gram_counts[entry["id"]] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, set()).add(entry["id"])
+        keys.sort()
+        with self._lock:
+            self._entries = {entry["id"]: entry for entry in entries}
+            self._keys = keys
+            self._postings = postings
+            self._gram_counts = gram_counts
+            self.loaded = True
+
+    def _prefix_ids(self, prefix: str, limit: int) -> List[int]:
+        start = bisect.bisect_left(self._keys, (prefix, -1))
+        ids = []
+        for key, employee_id in self._keys[start:]:
+            if not key.startswith(prefix) or len(ids) >= limit:
+                break
+            ids.append(employee_id)
+        return ids
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            scored: Dict[int, float] = {}
+            # Collect more prefix hits than needed so full-name hits can outrank last-name hits
+            for employee_id in self._prefix_ids(query, limit * 4):
+                entry = self._entries[employee_id]
+                full_name = f"{normalize(entry['first_name'])} {normalize(entry['last_name'])}"
+                score = 3.0 if full_name.startswith(query) else 2.0
+                scored[employee_id] = max(scored.get(employee_id, 0.0), score)
+            if len(scored) < limit and len(query) >= 3:
+                query_grams = trigrams(query)
+                shared = Counter()
+                for gram in query_grams:
+                    shared.update(self._postings.get(gram, ()))
+                # similarity <= common / len(query_grams), which prunes most candidates cheaply
+                min_common = SIMILARITY_THRESHOLD * len(query_grams)
+                for employee_id, common in shared.items():
+                    if common < min_common or employee_id in scored:
+                        continue
+                    name_grams = self._gram_counts[employee_id]
+                    similarity = common / (len(query_grams) + name_grams - common)
+                    if similarity >= SIMILARITY_THRESHOLD:
+                        scored[employee_id] = similarity
+            ranked = sorted(
+                scored.items(),
+                key=lambda item: (-item[1], self._entries[item[0]]["last_name"], item[0]),
+            )
+            return [self._entries[employee_id] for employee_id, _ in ranked[:limit]]
+
+name_index = NameIndex()
+
+SEARCH_COLUMNS = (
+    Employee.id,
+    Employee.first_name,
+    Employee.last_name,
+    Employee.department,
+    Employee.position,
+)
+
+def _entry(row) -> dict:
+    return {
+        "id": row.id,
+        "first_name": row.first_name,
+        "last_name": row.last_name,
+        "department": row.department,
+        "position": row.position,
+    }
+
+def _snapshot(employee: Employee) -> dict:
+    return {
+        "id": employee.id,
+        "first_name": employee.first_name,
+        "last_name": employee.last_name,
+        "department": employee.department,
+        "position": employee.position,
+    }
+
+def _apply_commit(upserts: List[dict], deleted: List[int]):
+    if not name_index.loaded:
+        return
+    for entry in upserts:
+        name_index.upsert(entry)
+    for employee_id in deleted:
+        name_index.remove(employee_id)
+
+# This worker's own ORM writes show up immediately
+on_commit(Employee, _snapshot, _apply_commit)
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def uses_database_search(dialect_name: str) -> bool:
+    if settings.SEARCH_BACKEND == "auto":
+        return dialect_name == "postgresql"
+    return settings.SEARCH_BACKEND == "database"
+
+async def search_employees(db, query: str, limit: int = 10) -> List[dict]:
+    """Ranked typeahead search: pg_trgm on PostgreSQL, the in-memory index otherwise"""
+    dialect = db.bind.dialect.name
+    if not uses_database_search(dialect):
+        if not name_index.loaded:
+            await refresh_name_index(full=True)
+        return name_index.search(query, limit)
+
+    query = normalize(query)
+    if not query:
+        return []
+    prefix = f"{_like_escape(query)}%"
+    word_prefix = f"% {_like_escape(query)}%"
+    rank = case(
+        (FULL_NAME.like(prefix, escape="\\"), 3),
+        (FULL_NAME.like(word_prefix, escape="\\"), 2),
+        else_=1,
+    )
+    result = await db.execute(
+        select(*SEARCH_COLUMNS)
+        .where(or_(
+            FULL_NAME.like(prefix, escape="\\"),
+            FULL_NAME.like(word_prefix, escape="\\"),
+            FULL_NAME.op("%")(query),
+        ))
+        .order_by(rank.desc(), func.similarity(FULL_NAME, query).desc(), Employee.last_name, Employee.id)
+        .limit(limit)
+    )
+    return [_entry(row) for row in result]
+
+async def refresh_name_index(full: bool = False):
+    """Load the index, or pick up rows created or updated since the last refresh.
+
+    Incremental refreshes cover writes made by other workers and Core bulk
+    inserts, which bypass the ORM commit hook. They cannot see deletes or rows
+    committed after the overlap window (a long import transaction), so the
+    index is reloaded in full every SEARCH_INDEX_REBUILD_SECONDS.
+    """
+    started = datetime.now(timezone.utc)
+    rebuild_due = (
+        name_index.loaded_at is None
+        or started - name_index.loaded_at >= timedelta(seconds=settings.SEARCH_INDEX_REBUILD_SECONDS)
+    )
+    async with AsyncSessionLocal() as db:
+        query = select(*SEARCH_COLUMNS)
+        if not full and not rebuild_due and name_index.loaded and name_index.refreshed_at is not None:
+            since = name_index.refreshed_at - REFRESH_OVERLAP
+            query = query.where(or_(Employee.created_at >= since, Employee.updated_at >= since))
+            for row in await db.execute(query):
+                name_index.upsert(_entry(row))
+        else:
+            name_index.load([_entry(row) for row in await db.execute(query)])
+            name_index.loaded_at = started
+    name_index.refreshed_at = started
+
+async def run_name_index_refresher():
+    """Background task: keep the in-memory index loaded and current"""
+    while True:
+        try:
+            await refresh_name_index(full=not name_index.loaded)
+        except Exception as e:
+            logger.error(f"Name index refresh failed: {e}")
+        await asyncio.sleep(settings.SEARCH_INDEX_REFRESH_SECONDS)
@@ -0,0 +1,76 @@
+import hashlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+def _default(value: Any):
+    # Decimals go out as strings, as pydantic writes Decimal fields
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding with UTC datetimes written as "Z", matching pydantic's output"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson.
+
+    Read endpoints return this directly with plain dicts built from column
+    rows, so FastAPI skips response_model validation and jsonable_encoder;
+    the response_model still documents the schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+USER_RESPONSE_FIELDS = ("email", "employee_id", "role", "id", "is_active", "created_at")
+
+def user_payload(user) -> dict:
+    """UserResponse fields from a principal, row or ORM user"""
+    return {field: getattr(user, field) for field in USER_RESPONSE_FIELDS}
+
+def employee_payload(row) -> dict:
+    """EmployeeResponse fields from a column row"""
+    payload = row._asdict()
+    # EmployeeResponse declares hire_date as a datetime and salary as an int;
+    # keep the wire format the validated path produced
+    if isinstance(payload.get("hire_date"), date) and not isinstance(payload["hire_date"], datetime):
+        payload["hire_date"] = datetime.combine(payload["hire_date"], time())
+    if payload.get("salary") is not None:
+        payload["salary"] = int(payload["salary"])
+    payload.pop("updated_at", None)  # selected for the ETag only
+    return payload
+
+# Profiles are per user and must be revalidated, but never re-sent unchanged
+PROFILE_CACHE_CONTROL = "private, no-cache"
+
+def profile_etag(kind: str, row_id: int, created_at: Optional[datetime], updated_at: Optional[datetime]) -> str:
+    """Weak ETag from the row id and its last write time (created_at until the first update)"""
+    version = updated_at or created_at
+    stamp = version.isoformat() if version is not None else ""
+    digest = hashlib.blake2b(f"{kind}:{row_id}:{stamp}".encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check using weak comparison"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (tag[2:] if tag.startswith("W/") else tag) == wanted
+        for tag in (part.strip() for part in header.split(","))
+    )
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": PROFILE_CACHE_CONTROL})
+
+def profile_response(payload: dict, etag: str) -> FastJSONResponse:
+    return FastJSONResponse(payload, headers={"ETag": etag, "Cache-Control": PROFILE_CACHE_CONTROL})
@@ -0,0 +1,193 @@
+"""
+Per-request SQL profiling.
+
+Every statement run while serving a request is counted against that
+request's profile. Repeated identical statement shapes are reported as a
+likely N+1, statements slower than SQL_SLOW_QUERY_MS go to the
+``sql.slow`` log with parameter values redacted, and routes that run more
+statements than their budget are reported. In strict mode (development and
+tests) both N+1 patterns and budget overruns raise, failing the request.
+
+Budgets come from the ``query_budget`` decorator on an endpoint, falling
+back to SQL_QUERY_BUDGET. ``assert_max_queries`` applies the same check to
+a block of code in tests or scripts.
+
+The same engine listeners and per-request profile feed the Prometheus SQL
+metrics (statement duration, statements and SQL time per request), so each
+statement is timed once.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from config import settings
+from metrics import DB_QUERIES_PER_REQUEST, DB_QUERY_DURATION, DB_TIME_PER_REQUEST
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("sql.slow")
+
+class QueryBudgetExceededError(RuntimeError):
+    """Raised in strict mode when a request breaks its query budget or repeats a statement too often"""
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDERS = re.compile(r"\$\d+|%\(\w+\)s|:\w+|\?|%s")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+def statement_shape(statement: str) -> str:
+    """Statement text with placeholders unified and IN lists collapsed, so N+1 repeats compare equal"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PLACEHOLDERS.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("?, ...", shape)
+
+def _redact_value(value) -> str:
+    return "NULL" if value is None else f"<{type(value).__name__}>"
+
+def redact_parameters(parameters, executemany: bool = False):
+    """Parameter types only; values never reach the log"""
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+def query_budget(limit: int):
+    """Endpoint decorator: maximum SQL statements per request, including authentication lookups"""
+    def decorator(func):
+        func.__query_budget__ = limit
+        return func
+    return decorator
+
+class QueryProfile:
+    """Statements run on behalf of one request (or one ``assert_max_queries`` block)"""
+
+    def __init__(self, label: Optional[str] = None, budget: Optional[int] = None, scope: Optional[dict] = None,
+                 strict: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.strict = strict
+        self._label = label
+        self._budget = budget
+        self._scope = scope
+
+    def _resolve(self):
+        # The route is only known once routing has run, after the profile was created
+        if self._label is None and self._scope is not None and "route" in self._scope:
+            self._label = getattr(self._scope["route"], "path", None)
+            budget = getattr(self._scope.get("endpoint"), "__query_budget__", None)
+            if budget is None:
+                budget = settings.SQL_QUERY_BUDGET or None
+            self._budget = budget
+
+    @property
+    def label(self) -> str:
+        self._resolve()
+        return self._label or "unmatched"
+
+    @property
+    def budget(self) -> Optional[int]:
+        self._resolve()
+        return self._budget
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.seconds += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == settings.SQL_N_PLUS_ONE_THRESHOLD:
+            message = f"Possible N+1 in {self.label}: {self.shapes[shape]} identical statements: {shape[:300]}"
+            logger.warning(message)
+            if self.strict:
+                raise QueryBudgetExceededError(message)
+        budget = self.budget
+        if budget is not None and self.count == budget + 1:
+            message = f"{self.label} exceeded its query budget of {budget}: {self.summary()}"
+            logger.warning(message)
+            if self.strict:
+                raise QueryBudgetExceededError(message)
+
+    def summary(self, top: int = 3) -> str:
+        repeated = "; ".join(f"{count}x {shape[:120]}" for shape, count in self.shapes.most_common(top))
+        return f"{self.count} statements in {self.seconds * 1000:.1f} ms ({repeated})"
+
+# SQLAlchemy carries the context into its greenlets
+_profile: ContextVar[Optional[QueryProfile]] = ContextVar("sql_profile", default=None)
+
+def instrument_engine(sync_engine, name: str):
+    """Time every statement on ``sync_engine`` (``async_engine.sync_engine`` for async engines)"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["profiler_started"].pop()
+        DB_QUERY_DURATION.labels(name).observe(elapsed)
+        profile = _profile.get()
+        if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+            label = profile.label if profile is not None else "background"
+            slow_query_logger.warning(
+                f"{elapsed * 1000:.1f} ms [{label}] {_WHITESPACE.sub(' ', statement).strip()} "
+                f"params={redact_parameters(parameters, executemany)}"
+            )
+        if profile is not None:
+            profile.record(statement, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        # Failed statements never reach after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("profiler_started"):
+            conn.info["profiler_started"].pop()
+
+class SQLProfilerMiddleware:
+    """Pure ASGI middleware giving each request its own QueryProfile and recording its SQL metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = QueryProfile(scope=scope, strict=settings.SQL_PROFILER_STRICT)
+        token = _profile.set(profile)
+
+        async def send_with_count(message):
+            # Strict (development) mode reports the count so far to the client
+            if message["type"] == "http.response.start" and profile.strict:
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-sql-queries", str(profile.count).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _profile.reset(token)
+            # The route template keeps label cardinality bounded (no raw paths)
+            DB_QUERIES_PER_REQUEST.labels(profile.label).observe(profile.count)
+            DB_TIME_PER_REQUEST.labels(profile.label).observe(profile.seconds)
+            if profile.count:
+                logger.debug(f"{scope['method']} {profile.label}: {profile.summary()}")
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "block"):
+    """Fail with AssertionError if the enclosed code runs more than ``limit`` SQL statements"""
+    profile = QueryProfile(label=label)
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+    if profile.count > limit:
+        raise AssertionError(f"{label} ran {profile.summary()}, budget {limit}")